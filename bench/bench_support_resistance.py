@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+from utils import calc_support_resistance
+
+# ================= LEGACY =================
+def legacy_support_resistance(df, window=20):
+    supports, resistances = [], []
+
+    for i in range(window, len(df) - window):
+        if df.low.iloc[i] == df.low.iloc[i-window:i+window].min():
+            supports.append(float(df.low.iloc[i]))
+        if df.high.iloc[i] == df.high.iloc[i-window:i+window].max():
+            resistances.append(float(df.high.iloc[i]))
+
+    return supports[-2:], resistances[-2:]
+
+# ================= DATA =================
+def random_candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = close + rng.normal(0, 0.5, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    # dibulatkan ke tick supaya ada low/high kembar seperti data asli
+    return pd.DataFrame({
+        "open": open_.round(2), "high": high.round(2),
+        "low": low.round(2), "close": close.round(2)
+    })
+
+def best_of(fn, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def main():
+    for n, repeat in ((200, 20), (5000, 3)):
+        df = random_candles(n, seed=n)
+        assert calc_support_resistance(df) == legacy_support_resistance(df)
+
+        old = best_of(legacy_support_resistance, df, repeat)
+        new = best_of(calc_support_resistance, df, repeat)
+        print(f"n={n:<5} legacy {old*1000:9.2f} ms | new {new*1000:7.3f} ms | x{old/new:,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+
+import ccxt
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+from candles import resample, timeframe_ms
+
+TIMEFRAMES = ["5m", "15m", "1h", "1d"]
+
+# ================= FIXTURE =================
+# {"recorded": ms, "markets": {...}, "tickers": {...},
+#  "ohlcv": {symbol: {tf: [[t, o, h, l, c, v], ...]}}}
+
+def load_fixture(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        return json.load(f)
+
+def save_fixture(fixture, path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as f:
+        json.dump(fixture, f)
+
+def _walk(rng, n, step, end, start_price):
+    t = end - step * np.arange(n)[::-1]
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.002)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.002)
+    vol = rng.integers(1_000, 100_000, n).astype(float)
+    return np.column_stack([t, open_, high, low, close, vol])
+
+def synthetic_fixture(symbols=50, bars=300, seed=0):
+    # 5m digenerate, 15m & 1h di-resample dari 5m supaya konsisten
+    # dengan jalur resample di CandleCache, 1d random walk sendiri
+    rng = np.random.default_rng(seed)
+    now = int(time.time() * 1000)
+    step5 = timeframe_ms("5m")
+    end5 = now // step5 * step5
+    n5 = bars * timeframe_ms("1h") // step5
+
+    fixture = {"recorded": now, "markets": {}, "tickers": {}, "ohlcv": {}}
+    for i in range(symbols):
+        sym = f"SYN{i}/USDT:USDT"
+        price = float(rng.uniform(0.01, 50_000))
+        base = _walk(rng, n5, step5, end5, price)
+
+        series = {"5m": base[-bars:]}
+        for tf in ("15m", "1h"):
+            series[tf] = resample(base, tf)[-bars:]
+        step1d = timeframe_ms("1d")
+        series["1d"] = _walk(rng, bars, step1d, now // step1d * step1d, price)
+
+        last = base[-1, 4]
+        day = base[-288:]
+        fixture["markets"][sym] = {
+            "id": sym.replace("/USDT:USDT", "_USDT"), "symbol": sym,
+            "base": sym.split("/")[0], "quote": "USDT", "settle": "USDT",
+            "type": "swap", "swap": True, "spot": False, "contract": True,
+            "active": True,
+        }
+        fixture["tickers"][sym] = {
+            "symbol": sym, "last": last,
+            "high": float(day[:, 2].max()), "low": float(day[:, 3].min()),
+            "percentage": float((last / day[0, 1] - 1) * 100),
+            "quoteVolume": float(rng.uniform(1e5, 1e9)),
+        }
+        fixture["ohlcv"][sym] = {tf: rows.tolist() for tf, rows in series.items()}
+    return fixture
+
+# ================= FAKE EXCHANGE =================
+class FakeMexc:
+    # pengganti ccxt.async_support.mexc: replay fixture dengan latency
+    # dan rate limit (request/detik, lewat batas -> RateLimitExceeded).
+    # timestamp candle digeser supaya bar terakhir = candle yang sedang
+    # berjalan, jadi logika delta / candle close di cache tetap jalan
+    def __init__(self, fixture, latency=0.03, rate=10, burst=10):
+        self.fixture = fixture
+        self.latency = latency
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.markets = fixture["markets"]
+        self.series = {
+            (sym, tf): np.asarray(rows, dtype=np.float64)
+            for sym, tfs in fixture["ohlcv"].items()
+            for tf, rows in tfs.items()
+        }
+        self.calls = {}
+        self.rejected = 0
+
+    def reset_counters(self):
+        self.calls = {}
+        self.rejected = 0
+
+    def requests(self):
+        return sum(self.calls.values())
+
+    async def _request(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.rate:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.rejected += 1
+                raise ccxt.RateLimitExceeded(f"fake mexc 429 {method}")
+            self.tokens -= 1
+        await asyncio.sleep(self.latency)
+
+    async def load_markets(self, reload=False, params={}):
+        await self._request("load_markets")
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+
+    async def fetch_tickers(self, symbols=None, params={}):
+        await self._request("fetch_tickers")
+        tickers = self.fixture["tickers"]
+        return {s: tickers[s] for s in symbols} if symbols else dict(tickers)
+
+    async def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params={}):
+        await self._request("fetch_ohlcv")
+        rows = self.series.get((symbol, timeframe))
+        if rows is None:
+            raise ccxt.BadSymbol(f"fake mexc {symbol} {timeframe}")
+
+        step = timeframe_ms(timeframe)
+        shift = int(time.time() * 1000) // step * step - rows[-1, 0]
+        rows = rows.copy()
+        rows[:, 0] += shift
+
+        limit = limit or 100
+        if since is not None:
+            rows = rows[rows[:, 0] >= since][:limit]
+        else:
+            rows = rows[-limit:]
+        return rows.tolist()
+
+    async def close(self):
+        pass
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+from fetcher import get_fetcher
+from tickers import is_usdt_perp
+from fakeexchange import TIMEFRAMES, save_fixture
+
+# rekam tickers + ohlcv MEXC untuk di-replay FakeMexc:
+#   python bench/record_fixtures.py --symbols 200 --out bench/fixtures/mexc.json.gz
+
+async def record(symbols, limit, out):
+    fetcher = get_fetcher()
+    try:
+        markets = await fetcher.load_markets()
+        tickers = await fetcher.fetch_tickers()
+
+        usdt = {s: t for s, t in tickers.items() if t and is_usdt_perp(s)}
+        top = sorted(usdt, key=lambda s: usdt[s].get("quoteVolume") or 0, reverse=True)[:symbols]
+
+        jobs = [(s, tf, limit) for s in top for tf in TIMEFRAMES]
+        rows = await fetcher.fetch_ohlcv_many(jobs)
+
+        ohlcv = {}
+        for (sym, tf, _), r in zip(jobs, rows):
+            if isinstance(r, Exception):
+                print(f"skip {sym} {tf}: {r}")
+                continue
+            ohlcv.setdefault(sym, {})[tf] = r
+
+        fixture = {
+            "recorded": int(time.time() * 1000),
+            "markets": {s: markets[s] for s in ohlcv},
+            "tickers": {s: usdt[s] for s in ohlcv},
+            "ohlcv": ohlcv,
+        }
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        save_fixture(fixture, out)
+        print(f"{len(ohlcv)} symbols -> {out}")
+    finally:
+        await fetcher.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=300)
+    parser.add_argument("--out", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "fixtures", "mexc.json.gz"
+    ))
+    args = parser.parse_args()
+    asyncio.run(record(args.symbols, args.limit, args.out))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bot"))
+
+# bot/config.py butuh env ini, tidak ada request ke Telegram
+os.environ.setdefault("BOT_TOKEN", "bench")
+os.environ.setdefault("TARGET", "1")
+
+import numpy as np
+import pandas as pd
+
+from fakeexchange import FakeMexc, load_fixture, synthetic_fixture
+from fetcher import get_fetcher, WeightBudget
+from exchange import MARKETS
+from candles import get_candle_cache, COLUMNS
+from store import CandleStore
+from tickers import get_ticker_snapshot
+from indicators import get_indicator_engine
+from delivery import start_delivery
+from streaming import ScanJob
+from subscriptions import SubscriptionIndex
+from utils import calc_support_resistance
+import kernels
+import stoch, pencaricoin, signalmonitor, scanner, signals
+
+# Benchmark scan end-to-end terhadap FakeMexc (fixture rekaman atau
+# sintetis), output JSON:
+#   python bench/run.py --out before.json
+#   python bench/run.py --compare before.json
+
+# ================= TELEGRAM STUB =================
+class FakeMessage:
+    def __init__(self):
+        self.sent = []
+
+    async def reply_text(self, text, **kwargs):
+        self.sent.append(text)
+        return self
+
+    async def edit_text(self, text, **kwargs):
+        self.sent.append(text)
+        return self
+
+class FakeBot:
+    def __init__(self):
+        self.sent = 0
+
+    async def _send(self, *args, **kwargs):
+        self.sent += 1
+        return FakeMessage()
+
+    send_message = send_photo = send_media_group = edit_message_text = _send
+
+# ================= STATE =================
+def reset_state(tmp):
+    # cold start: semua cache in-memory kosong, store disk baru
+    cache = get_candle_cache()
+    cache.rings.clear()
+    cache.locks.clear()
+    cache.store = CandleStore(tempfile.mkdtemp(dir=tmp))
+
+    get_indicator_engine().states.clear()
+    snap = get_ticker_snapshot()
+    snap.tickers = {}
+    snap.updated = 0.0
+    scanner.chart_cache.items.clear()
+    signalmonitor.detector.bias_memo.clear()
+
+# ================= RUNNERS =================
+async def bench_path(name, fn, ex, runs, tmp):
+    reset_state(tmp)
+    ex.reset_counters()
+    t = time.perf_counter()
+    await fn()
+    cold = time.perf_counter() - t
+    cold_requests, cold_rejected = ex.requests(), ex.rejected
+
+    warm, warm_requests = [], 0
+    for _ in range(runs):
+        ex.reset_counters()
+        t = time.perf_counter()
+        await fn()
+        warm.append(time.perf_counter() - t)
+        warm_requests = ex.requests()
+
+    result = {
+        "name": name,
+        "kind": "path",
+        "cold_s": cold,
+        "warm_s": min(warm) if warm else None,
+        "warm_mean_s": float(np.mean(warm)) if warm else None,
+        "requests_cold": cold_requests,
+        "requests_warm": warm_requests,
+        "rejected_cold": cold_rejected,
+    }
+    print(f"{name:<28} cold {cold:8.2f}s ({cold_requests} req) | "
+          f"warm {result['warm_s'] or 0:8.3f}s ({warm_requests} req)", file=sys.stderr)
+    return result
+
+def bench_micro(name, fn, df, repeat):
+    times = []
+    for _ in range(repeat):
+        data = df.copy()
+        t = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - t)
+
+    result = {
+        "name": name,
+        "kind": "micro",
+        "n": len(df),
+        "best_s": min(times),
+        "mean_s": float(np.mean(times)),
+    }
+    print(f"{name:<28} n={len(df):<6} best {min(times)*1000:8.3f} ms", file=sys.stderr)
+    return result
+
+# ================= SUITE =================
+async def run_suite(args, fixture):
+    ex = FakeMexc(
+        fixture,
+        latency=args.latency,
+        rate=0 if args.no_limit else args.rate,
+        burst=args.burst
+    )
+    fetcher = get_fetcher()
+    fetcher.exchange = ex
+    fetcher.markets_loaded = True
+    if args.no_limit:
+        fetcher.budget = WeightBudget(1e9, 1e9)
+    MARKETS.update(fixture["markets"])
+
+    bot = FakeBot()
+    delivery = start_delivery(bot, linger=0)
+    symbols = sorted(
+        fixture["tickers"],
+        key=lambda s: fixture["tickers"][s].get("quoteVolume") or 0,
+        reverse=True
+    )
+    # index di memory saja, file subscription bot tidak disentuh
+    signals.subscriptions = SubscriptionIndex()
+    for sym in symbols[:args.watchlist]:
+        signals.subscriptions.subscribe(os.environ["TARGET"], sym, save=False)
+    signals.MONITOR_MODE = "ALL"
+
+    async def send_charts():
+        coins = await scanner.get_top_movers()
+        await asyncio.gather(
+            *(scanner.send_chart(None, r.symbol, r.change, "15m") for _, r in coins.iterrows())
+        )
+
+    paths = {
+        # langsung run_scan: lewat ScanJobs, run warm cuma kena cache hasil
+        "stoch.scan": lambda: stoch.run_scan(ScanJob(None)),
+        "pencaricoin.run_scan": lambda: pencaricoin.run_scan(ScanJob(None)),
+        "signalmonitor.scan": lambda: signalmonitor.run_scan(ScanJob(None)),
+        "scanner.send_chart": send_charts,
+        "signals.monitor_loop": lambda: signals.monitor_once(None),
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for name, fn in paths.items():
+                if args.only and name not in args.only:
+                    continue
+                results.append(await bench_path(name, fn, ex, args.runs, tmp))
+        finally:
+            await delivery.close()
+            scanner.renderer.shutdown()
+
+    df = pd.DataFrame(fixture["ohlcv"][symbols[0]]["5m"], columns=COLUMNS)
+    micro = {
+        "calc_stochastic": stoch.calc_stochastic,
+        # EMA ribbon signalmonitor / pencaricoin, satu symbol
+        "ema_ribbon": lambda df: kernels.ema_ribbon(
+            df["close"].to_numpy(float)[None, :], signalmonitor.EMA_SPANS
+        ),
+        "calc_support_resistance": calc_support_resistance,
+    }
+    for name, fn in micro.items():
+        if args.only and name not in args.only:
+            continue
+        results.append(bench_micro(name, fn, df, args.repeat))
+
+    return results
+
+# ================= OUTPUT =================
+def fetcher_throttled():
+    return getattr(get_fetcher().budget, "throttled", 0)
+
+def git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(base, report):
+    # rasio new / base, < 1 berarti lebih cepat
+    old = {r["name"]: r for r in base["results"]}
+    for r in report["results"]:
+        b = old.get(r["name"])
+        if not b:
+            continue
+        for key in ("cold_s", "warm_s", "best_s", "requests_cold", "requests_warm"):
+            if b.get(key) and r.get(key) is not None:
+                print(f"{r['name']:<28} {key:<14} {b[key]:>12.4f} -> {r[key]:>12.4f}"
+                      f"  x{r[key] / b[key]:.2f}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", help="fixture dari record_fixtures.py (default: sintetis)")
+    parser.add_argument("--symbols", type=int, default=50, help="jumlah symbol fixture sintetis")
+    parser.add_argument("--latency", type=float, default=0.03, help="detik per request")
+    parser.add_argument("--rate", type=float, default=10, help="request/detik fake exchange")
+    parser.add_argument("--burst", type=float, default=10)
+    parser.add_argument("--no-limit", action="store_true", help="tanpa rate limit sama sekali")
+    parser.add_argument("--runs", type=int, default=2, help="run warm per path")
+    parser.add_argument("--repeat", type=int, default=50, help="ulangan micro benchmark")
+    parser.add_argument("--watchlist", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="nama benchmark yang dijalankan")
+    parser.add_argument("--out", help="tulis JSON ke file (default stdout)")
+    parser.add_argument("--compare", help="JSON hasil sebelumnya")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture) if args.fixture else synthetic_fixture(args.symbols)
+    results = asyncio.run(run_suite(args, fixture))
+
+    report = {
+        "meta": {
+            "rev": git_rev(),
+            "time": int(time.time()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "fixture": args.fixture or f"synthetic:{args.symbols}",
+            "symbols": len(fixture["tickers"]),
+            "latency": args.latency,
+            "rate": 0 if args.no_limit else args.rate,
+            "throttled": fetcher_throttled(),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
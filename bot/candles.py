@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+
+import ccxt
+import numpy as np
+
+from fetcher import get_fetcher
+from store import get_candle_store
+from metrics import timed
+from series import COLUMNS, CandleSeries
+
+log = logging.getLogger("CANDLES")
+
+# ================= CONFIG =================
+MAX_DELTA = 1000  # lebih dari ini bar tertinggal -> full reload
+BASE_MAX_AGE = 30  # detik, candle base lebih tua dari ini di-refresh sebelum resample
+
+# ================= TIMEFRAME =================
+def timeframe_ms(tf):
+    return ccxt.Exchange.parse_timeframe(tf) * 1000
+
+def last_closed_open(tf, now_ms=None):
+    # open time candle closed terakhir (candle UTC, sama dengan exchange)
+    step = timeframe_ms(tf)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return now_ms // step * step - step
+
+def current_open(tf, now_ms=None):
+    # open time candle yang sedang berjalan
+    step = timeframe_ms(tf)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return now_ms // step * step
+
+# ================= RESAMPLE =================
+def resample(rows, tf):
+    # rows: array (n, 6) candle base urut waktu -> candle tf yang
+    # bucket-nya sejajar boundary UTC exchange (open // step * step).
+    # bucket pertama yang tidak mulai dari boundary dibuang, bucket
+    # terakhir boleh parsial (candle tf yang masih forming)
+    rows = np.asarray(rows, dtype=np.float64)
+    if not len(rows):
+        return np.empty((0, len(COLUMNS)))
+
+    step = timeframe_ms(tf)
+    bucket = rows[:, 0] // step * step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+
+    out = np.empty((len(starts), len(COLUMNS)))
+    out[:, 0] = bucket[starts]
+    out[:, 1] = rows[starts, 1]
+    out[:, 2] = np.maximum.reduceat(rows[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(rows[:, 3], starts)
+    out[:, 4] = rows[ends - 1, 4]
+    out[:, 5] = np.add.reduceat(rows[:, 5], starts)
+
+    if rows[0, 0] != bucket[0]:
+        out = out[1:]
+    return out
+
+# ================= RING BUFFER =================
+class CandleRing:
+    # setiap bar ditulis 2x (i dan i+capacity) supaya tail selalu
+    # bisa diambil sebagai view numpy yang contiguous tanpa copy
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = np.empty((capacity * 2, len(COLUMNS)), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+        self.fetched = 0   # ms, waktu request exchange terakhir dikirim
+
+    def _write(self, pos, row):
+        self.buf[pos] = row
+        self.buf[pos + self.capacity] = row
+
+    def append(self, row):
+        pos = (self.start + self.size) % self.capacity
+        self._write(pos, row)
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def replace_last(self, row):
+        self._write((self.start + self.size - 1) % self.capacity, row)
+
+    def last_time(self):
+        if not self.size:
+            return None
+        return int(self.buf[self.start + self.size - 1, 0])
+
+    def view(self, n=None):
+        n = self.size if n is None else min(n, self.size)
+        end = self.start + self.size
+        return self.buf[end - n:end]
+
+    def merge(self, rows):
+        # rows urut waktu; bar terakhir (masih forming) di-replace,
+        # bar baru di-append, bar lama diabaikan
+        for row in rows:
+            last = self.last_time()
+            t = row[0]
+            if last is None or t > last:
+                self.append(row)
+            elif t == last:
+                self.replace_last(row)
+
+# ================= CACHE =================
+class CandleCache:
+    def __init__(self, fetcher=None, store=None):
+        self.fetcher = fetcher or get_fetcher()
+        self.store = store
+        self.rings = {}
+        self.locks = {}
+
+    async def _persist(self, key, ring):
+        # write-through candle closed ke store disk, di thread (file I/O +
+        # flock antar process tidak memblokir event loop)
+        if self.store is None:
+            return
+        symbol, tf = key
+        rows = ring.view()
+        # closed = sudah close saat request dikirim, bukan saat _persist
+        # jalan: boundary bisa lewat selama await fetch, bar terakhir ring
+        # masih data forming
+        rows = rows[rows[:, 0] < current_open(tf, ring.fetched)]   # copy
+        if not len(rows):
+            return
+
+        # store harus bersambung, kalau ada lubang mulai ulang
+        await asyncio.to_thread(self.store.append, symbol, tf, rows, timeframe_ms(tf))
+
+    def _stored(self, symbol, tf, limit):
+        if self.store.length(symbol, tf) < limit:
+            return None
+        rows = self.store.rows(symbol, tf, limit)
+        return rows if len(rows) >= limit else None
+
+    async def _full_load(self, key, limit, use_store=True):
+        symbol, tf = key
+
+        # warm restart: seed dari disk, cukup ambil gap sejak shutdown
+        stored = None
+        if use_store and self.store is not None:
+            stored = await asyncio.to_thread(self._stored, symbol, tf, limit)
+        if stored is not None:
+            ring = CandleRing(limit)
+            ring.merge(stored)
+            self.rings[key] = ring
+            return await self._delta_load(key, ring)
+
+        fetched = int(time.time() * 1000)
+        rows = await self.fetcher.fetch_ohlcv(symbol, tf, limit=limit)
+        ring = CandleRing(limit)
+        ring.merge(rows)
+        ring.fetched = fetched
+        self.rings[key] = ring
+        await self._persist(key, ring)
+        return ring
+
+    async def _delta_load(self, key, ring):
+        symbol, tf = key
+        last = ring.last_time()
+        now = int(time.time() * 1000)
+        missing = (now - last) // timeframe_ms(tf) + 2
+
+        if missing > min(ring.capacity, MAX_DELTA):
+            return await self._full_load(key, ring.capacity, use_store=False)
+
+        rows = await self.fetcher.fetch_ohlcv(symbol, tf, limit=missing, since=last)
+        fetched = now
+
+        # delta harus overlap dengan bar terakhir, kalau tidak ada bar
+        # yang hilang di tengah -> reload penuh
+        if not rows or rows[0][0] > last:
+            log.warning(f"{symbol} {tf} delta tidak overlap, full reload")
+            return await self._full_load(key, ring.capacity, use_store=False)
+
+        ring.merge(rows)
+        ring.fetched = fetched
+        await self._persist(key, ring)
+        return ring
+
+    async def _load(self, key, limit):
+        ring = self.rings.get(key)
+        if ring is None or ring.capacity < limit or not ring.size:
+            return await self._full_load(key, limit)
+        return await self._delta_load(key, ring)
+
+    async def get(self, symbol, tf, limit):
+        key = (symbol, tf)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+
+        async with lock, timed("fetch", tf, symbol):
+            ring = await self._load(key, limit)
+            # view ke buffer ring, copy dulu kalau disimpan lewat await
+            return ring.view(limit)
+
+    async def get_resampled(self, symbol, tf, limit, base):
+        # tf besar di-top-up dari candle base yang sudah di-cache, tanpa
+        # request. fetch native cuma untuk seed pertama (history panjang,
+        # warm-up EMA) atau kalau ring base tidak menutup gap.
+        # candle base di-refresh dulu kalau candle baru sudah mulai atau
+        # fetch terakhir > BASE_MAX_AGE: bar tf forming paling telat
+        # BASE_MAX_AGE detik, bar closed selalu lengkap. scan yang baru
+        # fetch base (pipeline, signalmonitor) tidak kena request tambahan
+        key = (symbol, tf)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+
+        base_ring = self.rings.get((symbol, base))
+        if base_ring is not None and base_ring.size:
+            now = int(time.time() * 1000)
+            if (
+                base_ring.last_time() < current_open(base, now)
+                or now - base_ring.fetched > BASE_MAX_AGE * 1000
+            ):
+                await self.get(symbol, base, base_ring.capacity)
+            base_ring = self.rings[(symbol, base)]
+
+        async with lock, timed("fetch", tf, symbol):
+            ring = self.rings.get(key)
+            if (
+                ring is None or ring.capacity < limit or not ring.size
+                or base_ring is None or not base_ring.size
+                or base_ring.view()[0, 0] > ring.last_time()
+            ):
+                ring = await self._load(key, limit)
+            else:
+                rows = base_ring.view()
+                ring.merge(resample(rows[rows[:, 0] >= ring.last_time()], tf))
+                # bar tf lengkap hanya kalau candle base-nya sudah di-fetch
+                ring.fetched = base_ring.fetched
+                await self._persist(key, ring)
+            return ring.view(limit)
+
+    async def series(self, symbol, tf, limit, base=None):
+        # CandleSeries: satu copy dari ring (ring bisa bergeser setelah
+        # await berikutnya), kolom contiguous untuk detector / kernels
+        if base and base != tf:
+            return CandleSeries(await self.get_resampled(symbol, tf, limit, base))
+        return CandleSeries(await self.get(symbol, tf, limit))
+
+    async def fetch_ohlcv(self, symbol, tf, limit, base=None):
+        # drop-in pengganti exchange.fetch_ohlcv (list of lists)
+        return (await self.series(symbol, tf, limit, base)).tolist()
+
+_CACHE = None
+
+def get_candle_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = CandleCache(store=get_candle_store())
+    return _CACHE
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+from candles import last_closed_open
+
+# ================= CHART CACHE =================
+# key: (symbol, tf, open time candle closed terakhir, change %, supports,
+#       resistances). change ikut key karena tampil di judul PNG & caption
+# value: (png, caption)
+class ChartCache:
+    def __init__(self, max_items=64):
+        self.items = OrderedDict()
+        self.max_items = max_items
+
+    def _prune(self):
+        # buang chart yang candle-nya sudah digantikan candle closed baru
+        for key in [k for k in self.items if k[2] < last_closed_open(k[1])]:
+            del self.items[key]
+
+    def find(self, symbol, tf, closed_ts, change):
+        self._prune()
+        for key in reversed(self.items):
+            if key[:4] == (symbol, tf, closed_ts, change):
+                self.items.move_to_end(key)
+                return self.items[key]
+        return None
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is not None:
+            self.items.move_to_end(key)
+        return item
+
+    def put(self, key, item):
+        self._prune()
+        for old in [k for k in self.items if k[:2] == key[:2] and k[2] < key[2]]:
+            del self.items[old]
+
+        self.items[key] = item
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
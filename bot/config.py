@@ -5,10 +5,20 @@ TARGET = os.getenv("TARGET")
 
 # === SCANNER CONFIG ===
 TOP_N = 10
-SEND_DELAY = 3
 LIMIT = 200
 MIN_MOVE_PCT = 3
 
+# === CHART RENDER ===
+RENDER_WORKERS = 2
+RENDER_QUEUE_DEPTH = 8
+CHART_CACHE_SIZE = 64
+
+# === TELEGRAM DELIVERY ===
+SEND_PER_CHAT_RATE = 1      # msg/detik ke chat private
+SEND_GROUP_PER_MIN = 20     # msg/menit ke group/channel
+SEND_GLOBAL_RATE = 30       # msg/detik total bot
+MEDIA_GROUP_LINGER = 1.0    # detik menunggu foto lain sebelum kirim album
+
 TF_MAP = {
     "5m": 300,
     "15m": 900,
@@ -16,10 +26,22 @@ TF_MAP = {
     "1d": 86400
 }
 
+# === METRICS ===
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 = mati
+
 # === SIGNAL CONFIG ===
 SIGNAL_TF = "15m"
-SIGNAL_INTERVAL = 900
 SIGNAL_COOLDOWN = 900
+SIGNAL_EMAS = (9, 26, 50, 200)
+
+# === SCAN WORKERS ===
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "0"))                 # 0 = scan di process bot
+SCAN_WORKER_BACKEND = os.getenv("SCAN_WORKER_BACKEND", "process")  # process | local
+
+# === SCHEDULER ===
+SCHEDULE_SETTLE = 5         # detik setelah candle close sebelum job jalan
+SIGNAL_SPREAD = 30          # detik, cek watchlist disebar sepanjang ini
 
 if not BOT_TOKEN or not TARGET:
     raise ValueError("BOT_TOKEN atau TARGET belum diset")
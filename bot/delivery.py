@@ -0,0 +1,202 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from telegram import InputMediaPhoto
+from telegram.error import (
+    BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TelegramError
+)
+
+from fetcher import WeightBudget
+from metrics import SENDS, timed
+
+log = logging.getLogger("DELIVERY")
+
+MEDIA_GROUP_MAX = 10
+
+@dataclass
+class Outgoing:
+    kind: str              # "photo" | "text"
+    payload: object        # bytes PNG atau text
+    caption: str = None
+    kwargs: dict = field(default_factory=dict)
+
+def is_group(chat_id):
+    try:
+        return int(chat_id) < 0
+    except (TypeError, ValueError):
+        return True  # @channelusername
+
+# ================= DELIVERY QUEUE =================
+class DeliveryQueue:
+    # satu antrian + worker per chat, token bucket per chat & global.
+    # foto yang antri berdekatan dipak jadi satu send_media_group.
+    def __init__(self, bot, per_chat_rate=1.0, group_per_min=20,
+                 global_rate=30, linger=1.0, max_retries=5):
+        self.bot = bot
+        self.per_chat_rate = per_chat_rate
+        self.group_rate = group_per_min / 60
+        self.global_budget = WeightBudget(global_rate, global_rate)
+        self.linger = linger
+        self.max_retries = max_retries
+        self.queues = {}
+        self.workers = {}
+        self.migrated = {}   # chat_id lama -> id supergroup baru
+
+    # ================= PRODUCER (non-blocking) =================
+    def _put(self, chat_id, item):
+        chat_id = self.migrated.get(chat_id, chat_id)
+        q = self.queues.get(chat_id)
+        if q is None:
+            q = self.queues[chat_id] = asyncio.Queue()
+        # worker mati (mis. error tak terduga) -> jalankan lagi, antrian tetap
+        worker = self.workers.get(chat_id)
+        if worker is None or worker.done():
+            self.workers[chat_id] = asyncio.ensure_future(self._worker(chat_id, q))
+        q.put_nowait(item)
+
+    def send_photo(self, chat_id, photo, caption=None):
+        self._put(chat_id, Outgoing("photo", photo, caption))
+
+    def send_message(self, chat_id, text, **kwargs):
+        self._put(chat_id, Outgoing("text", text, kwargs=kwargs))
+
+    def _migrate(self, old, new):
+        # group jadi supergroup: antrian & worker pindah ke id baru, item
+        # berikutnya langsung dikirim ke sana
+        self.migrated[old] = new
+        q, worker = self.queues.pop(old, None), self.workers.pop(old, None)
+        if q is not None and new not in self.queues:
+            self.queues[new] = q
+            self.workers[new] = worker
+
+    def pending(self):
+        return sum(q.qsize() for q in self.queues.values())
+
+    # ================= WORKER =================
+    async def _collect_photos(self, q, first):
+        # ambil foto yang sudah/segera antri (linger) sampai 10 item
+        batch, carry = [first], None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.linger
+
+        while len(batch) < MEDIA_GROUP_MAX:
+            try:
+                if q.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    item = await asyncio.wait_for(q.get(), timeout)
+                else:
+                    item = q.get_nowait()
+            except asyncio.TimeoutError:
+                break
+
+            if item.kind != "photo":
+                carry = item
+                break
+            batch.append(item)
+
+        return batch, carry
+
+    async def _worker(self, chat_id, q):
+        rate = self.group_rate if is_group(chat_id) else self.per_chat_rate
+        budget = WeightBudget(rate, 1)
+        carry = None
+
+        while True:
+            item = carry or await q.get()
+            carry = None
+
+            try:
+                batch = [item]
+                if item.kind == "photo":
+                    batch, carry = await self._collect_photos(q, item)
+
+                # tiap foto album dihitung Telegram sebagai satu pesan
+                await budget.acquire(len(batch))
+                await self.global_budget.acquire(len(batch))
+                await self._send(chat_id, batch)
+            except Exception:
+                # satu batch gagal tidak boleh menghentikan antrian chat
+                log.exception(f"Worker chat {chat_id} gagal kirim")
+
+            chat_id = self.migrated.get(chat_id, chat_id)
+            if self.queues.get(chat_id) is not q:
+                # id baru sudah punya antrian sendiri: sisa item ikut ke sana
+                rest = [carry] if carry else []
+                while not q.empty():
+                    rest.append(q.get_nowait())
+                for item in rest:
+                    self._put(chat_id, item)
+                return
+
+    async def _call(self, chat_id, batch):
+        item = batch[0]
+        if item.kind == "text":
+            return await self.bot.send_message(chat_id=chat_id, text=item.payload, **item.kwargs)
+        if len(batch) == 1:
+            return await self.bot.send_photo(chat_id=chat_id, photo=item.payload, caption=item.caption)
+        return await self.bot.send_media_group(
+            chat_id=chat_id,
+            media=[InputMediaPhoto(i.payload, caption=i.caption) for i in batch]
+        )
+
+    async def _send(self, chat_id, batch):
+        kind = batch[0].kind if len(batch) == 1 else "album"
+        for attempt in range(self.max_retries):
+            try:
+                with timed("send", kind):
+                    result = await self._call(chat_id, batch)
+                SENDS.inc(kind, "ok")
+                return result
+            except RetryAfter as e:
+                SENDS.inc(kind, "retry_after")
+                wait = e.retry_after
+                wait = wait.total_seconds() if hasattr(wait, "total_seconds") else wait
+                log.warning(f"RetryAfter {wait}s chat {chat_id}")
+                await asyncio.sleep(wait + attempt)
+            except ChatMigrated as e:
+                # group jadi supergroup, kirim ulang ke id baru
+                SENDS.inc(kind, "migrated")
+                log.warning(f"Chat {chat_id} pindah ke {e.new_chat_id}")
+                self._migrate(chat_id, e.new_chat_id)
+                chat_id = e.new_chat_id
+            except BadRequest as e:
+                SENDS.inc(kind, "rejected")
+                log.error(f"Kirim ke {chat_id} ditolak: {e}")
+                return None
+            except NetworkError as e:
+                SENDS.inc(kind, "retry")
+                log.warning(f"Kirim ke {chat_id} retry {attempt+1}: {e}")
+                await asyncio.sleep(2 ** attempt)
+            except Forbidden as e:
+                # bot di-block / dikeluarkan dari chat
+                SENDS.inc(kind, "forbidden")
+                log.error(f"Kirim ke {chat_id} dilarang: {e}")
+                return None
+            except TelegramError as e:
+                SENDS.inc(kind, "rejected")
+                log.error(f"Kirim ke {chat_id} gagal: {e}")
+                return None
+
+        SENDS.inc(kind, "failed")
+        log.error(f"Gagal kirim {len(batch)} item ke {chat_id}")
+        return None
+
+    async def close(self):
+        for task in self.workers.values():
+            task.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.workers.clear()
+        self.queues.clear()
+
+_DELIVERY = None
+
+def start_delivery(bot, **kwargs):
+    global _DELIVERY
+    _DELIVERY = DeliveryQueue(bot, **kwargs)
+    return _DELIVERY
+
+def get_delivery():
+    return _DELIVERY
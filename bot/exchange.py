@@ -1,16 +1,117 @@
-import ccxt
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
 
-exchange = ccxt.mexc({
-    "enableRateLimit": True,
-    "options": {"defaultType": "swap"}
-})
+from fetcher import get_fetcher
 
-markets = exchange.load_markets()
+log = logging.getLogger("MARKETS")
 
-SYMBOLS = [
-    s for s in markets
-    if s.endswith(":USDT") and markets[s].get("swap")
-]
+# ================= CONFIG =================
+MARKETS_CACHE_FILE = os.getenv(
+    "MARKETS_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "markets.json")
+)
+MARKETS_TTL = 6 * 3600  # seconds
+
+# ================= INDEX =================
+class MarketIndex:
+    # SYMBOLS & set swap di-update in place, jadi referensi yang sudah
+    # di-import modul lain tetap valid setelah refresh
+    def __init__(self):
+        self.markets = {}
+        self.symbols = []
+        self.swap = set()
+        self.updated = 0.0
+
+    def update(self, markets, updated=None):
+        swap = {s for s, m in markets.items() if m.get("swap")}
+        self.markets = markets
+        self.swap.clear()
+        self.swap.update(swap)
+        self.symbols[:] = sorted(s for s in swap if s.endswith(":USDT"))
+        self.updated = time.time() if updated is None else updated
+
+    def age(self):
+        return time.time() - self.updated
+
+    def available(self, symbol):
+        return symbol in self.swap
+
+MARKETS = MarketIndex()
+SYMBOLS = MARKETS.symbols
 
 def symbol_available(symbol):
-    return symbol in markets and markets[symbol].get("swap")
+    return MARKETS.available(symbol)
+
+# ================= DISK CACHE =================
+def load_cached_markets(path=MARKETS_CACHE_FILE):
+    # file rusak / format lama -> anggap tidak ada cache, load dari exchange
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        markets, updated = dict(data["markets"]), float(data["time"])
+        get_fetcher().set_markets(markets)
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+    MARKETS.update(markets, updated)
+    log.info(f"{len(markets)} markets dari cache ({int(MARKETS.age())}s)")
+    return True
+
+def save_cached_markets(markets, path=MARKETS_CACHE_FILE):
+    # tmp unik per penulis (bot & worker bisa refresh bersamaan)
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    f = tempfile.NamedTemporaryFile("w", dir=folder, suffix=".tmp", delete=False)
+    try:
+        with f:
+            json.dump({"time": time.time(), "markets": markets}, f)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+# ================= REFRESH =================
+_REFRESH = None
+
+async def _refresh():
+    global _REFRESH
+    try:
+        markets = await get_fetcher().load_markets(reload=True)
+        # cukup market swap yang dipakai bot
+        swap = {s: m for s, m in markets.items() if m.get("swap")}
+        MARKETS.update(swap)
+        save_cached_markets(swap)
+        log.info(f"Markets refreshed ({len(swap)} swap)")
+    finally:
+        _REFRESH = None
+
+async def refresh_markets():
+    global _REFRESH
+    if _REFRESH is None:
+        _REFRESH = asyncio.ensure_future(_refresh())
+    await asyncio.shield(_REFRESH)
+
+async def try_refresh_markets():
+    try:
+        await refresh_markets()
+    except Exception as e:
+        log.warning(f"Refresh markets gagal: {e}")
+
+async def ensure_markets():
+    # boot: pakai cache disk kalau ada, refresh jalan di background
+    if MARKETS.markets:
+        return
+    if load_cached_markets():
+        if MARKETS.age() >= MARKETS_TTL:
+            asyncio.ensure_future(try_refresh_markets())
+        return
+    await refresh_markets()
+
+async def market_refresh_loop():
+    while True:
+        await asyncio.sleep(max(60, MARKETS_TTL - MARKETS.age()))
+        await try_refresh_markets()
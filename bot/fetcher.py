@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import ssl
+import time
+
+import aiohttp
+import ccxt
+import ccxt.async_support as ccxt_async
+import certifi
+
+from metrics import REQUESTS, REQUEST_SECONDS, WEIGHT_RATE
+
+log = logging.getLogger("FETCHER")
+
+# ================= CONFIG =================
+MAX_CONCURRENCY = 16      # request yang boleh in-flight bersamaan
+WEIGHT_PER_SECOND = 20    # budget awal weight MEXC contract public API
+WEIGHT_BURST = 20
+
+# AIMD: naik WEIGHT_INCREASE tiap detik tanpa 429, turun separuh saat 429
+WEIGHT_MIN = 4
+WEIGHT_MAX = 80
+WEIGHT_INCREASE = 2
+WEIGHT_DECREASE = 0.5
+
+RETRIES = 3
+THROTTLE_RETRIES = 5      # retry khusus 429, jeda diatur budget
+RETRY_DELAY = 1  # seconds, dikali nomor percobaan
+
+# weight per endpoint (sama dengan cost di ccxt mexc)
+ENDPOINT_WEIGHT = {
+    "fetch_ohlcv": 2,
+    "fetch_tickers": 2,
+    "load_markets": 100,
+}
+
+# timeout per endpoint (detik), timeout dihitung sebagai NetworkError (retry)
+ENDPOINT_TIMEOUT = {
+    "fetch_ohlcv": 10,
+    "fetch_tickers": 15,
+    "load_markets": 30,
+}
+DEFAULT_TIMEOUT = 10
+
+# HTTP pool: koneksi keep-alive dipakai ulang, tanpa TLS handshake per request
+HTTP_POOL_SIZE = MAX_CONCURRENCY
+HTTP_KEEPALIVE = 60       # detik koneksi idle tetap dibuka
+HTTP_DNS_TTL = 300
+
+# ================= WEIGHT BUDGET =================
+class WeightBudget:
+    def __init__(self, per_second=WEIGHT_PER_SECOND, burst=WEIGHT_BURST):
+        self.rate = per_second
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, weight):
+        # weight > capacity tetap boleh lewat, tokens jadi negatif (utang)
+        async with self.lock:
+            self._refill()
+            need = min(weight, self.capacity)
+            while self.tokens < need:
+                await asyncio.sleep((need - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= weight
+
+class AdaptiveBudget(WeightBudget):
+    # budget yang menyesuaikan diri dengan feedback exchange: tiap detik
+    # tanpa 429 rate naik sedikit (additive), 429 / DDoSProtection
+    # memotong rate (multiplicative) dan mengosongkan token
+    def __init__(self, per_second=WEIGHT_PER_SECOND, burst=WEIGHT_BURST,
+                 min_rate=WEIGHT_MIN, max_rate=WEIGHT_MAX,
+                 increase=WEIGHT_INCREASE, decrease=WEIGHT_DECREASE):
+        super().__init__(per_second, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.changed = time.monotonic()
+        self.last_cut = 0.0
+        self.throttled = 0
+        WEIGHT_RATE.set(self.rate)
+
+    def _set_rate(self, rate):
+        self.rate = max(self.min_rate, min(self.max_rate, rate))
+        self.changed = time.monotonic()
+        WEIGHT_RATE.set(self.rate)
+
+    def on_success(self):
+        if self.rate < self.max_rate and time.monotonic() - self.changed >= 1:
+            self._set_rate(self.rate + self.increase)
+
+    def on_throttle(self):
+        self.throttled += 1
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+        # request in-flight bisa kena 429 bersamaan, cukup dipotong
+        # sekali per detik
+        now = time.monotonic()
+        if now - self.last_cut >= 1:
+            self.last_cut = now
+            self._set_rate(self.rate * self.decrease)
+            log.warning(f"429 dari exchange, budget turun ke {self.rate:.1f} weight/s")
+
+    def status(self):
+        self._refill()
+        return {
+            "rate": self.rate,
+            "tokens": self.tokens,
+            "capacity": self.capacity,
+            "throttled": self.throttled,
+        }
+
+# ================= FETCHER =================
+class Fetcher:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, weight_per_second=WEIGHT_PER_SECOND):
+        self.exchange = None
+        self.session = None
+        self.sem = asyncio.Semaphore(max_concurrency)
+        self.budget = AdaptiveBudget(weight_per_second)
+        self.markets_loaded = False
+        self.markets_lock = asyncio.Lock()
+
+    def _session(self):
+        # satu pool koneksi per process, dibuat di dalam event loop
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_POOL_SIZE,
+            keepalive_timeout=HTTP_KEEPALIVE,
+            ttl_dns_cache=HTTP_DNS_TTL,
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+            enable_cleanup_closed=True
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers={"Accept-Encoding": "gzip, deflate"}
+        )
+
+    def client(self):
+        # rate limit ccxt dimatikan, pacing diatur WeightBudget. session
+        # milik fetcher (ccxt tidak membuat connector sendiri), timeout
+        # ccxt cuma batas atas, timeout per endpoint di call()
+        if self.exchange is None:
+            self.session = self._session()
+            self.exchange = ccxt_async.mexc({
+                "enableRateLimit": False,
+                "session": self.session,
+                "timeout": max(ENDPOINT_TIMEOUT.values()) * 1000,
+                "options": {"defaultType": "swap"}
+            })
+        return self.exchange
+
+    def _feedback(self, name, *args):
+        # budget lama (WeightBudget biasa) tidak punya feedback
+        fn = getattr(self.budget, name, None)
+        if fn is not None:
+            fn(*args)
+
+    async def call(self, method, *args, **kwargs):
+        weight = ENDPOINT_WEIGHT.get(method, 1)
+        timeout = ENDPOINT_TIMEOUT.get(method, DEFAULT_TIMEOUT)
+        errors = throttles = 0
+        while True:
+            try:
+                async with self.sem:
+                    await self.budget.acquire(weight)
+                    start = time.perf_counter()
+                    try:
+                        result = await asyncio.wait_for(
+                            getattr(self.client(), method)(*args, **kwargs), timeout
+                        )
+                    except asyncio.TimeoutError:
+                        raise ccxt.RequestTimeout(f"{method} timeout {timeout}s")
+                    REQUEST_SECONDS.observe(time.perf_counter() - start, method)
+                    REQUESTS.inc(method, "ok")
+                    self._feedback("on_success")
+                    return result
+            except (ccxt.DDoSProtection, ccxt.RateLimitExceeded) as e:
+                # 429: tidak pakai sleep tetap, request berikutnya menunggu
+                # budget yang sudah diturunkan
+                self._feedback("on_throttle")
+                throttles += 1
+                if throttles >= THROTTLE_RETRIES:
+                    REQUESTS.inc(method, "error")
+                    raise
+                REQUESTS.inc(method, "throttled")
+                log.warning(f"{method} {args[:2]} throttled {throttles}: {e}")
+            except ccxt.NetworkError as e:
+                errors += 1
+                if errors >= RETRIES:
+                    REQUESTS.inc(method, "error")
+                    raise
+                REQUESTS.inc(method, "retry")
+                log.warning(f"{method} {args[:2]} retry {errors}: {e}")
+                await asyncio.sleep(RETRY_DELAY * errors)
+
+    async def load_markets(self, reload=False):
+        if reload or not self.markets_loaded:
+            async with self.markets_lock:
+                if reload or not self.markets_loaded:
+                    await self.call("load_markets", reload)
+                    self.markets_loaded = True
+        return self.client().markets
+
+    def set_markets(self, markets):
+        # market dari cache disk, load_markets tidak perlu request lagi
+        self.client().set_markets(markets)
+        self.markets_loaded = True
+
+    async def fetch_tickers(self, symbols=None):
+        await self.load_markets()
+        return await self.call("fetch_tickers", symbols)
+
+    async def fetch_ohlcv(self, symbol, tf, limit=None, since=None):
+        await self.load_markets()
+        return await self.call("fetch_ohlcv", symbol, tf, since=since, limit=limit)
+
+    async def fetch_ohlcv_many(self, jobs):
+        # jobs: [(symbol, tf, limit), ...] -> hasil urut sesuai jobs,
+        # error dikembalikan sebagai exception (tidak menggagalkan batch)
+        await self.load_markets()
+        return await asyncio.gather(
+            *(self.fetch_ohlcv(sym, tf, limit) for sym, tf, limit in jobs),
+            return_exceptions=True
+        )
+
+    async def close(self):
+        if self.exchange is not None:
+            await self.exchange.close()
+            self.exchange = None
+            self.markets_loaded = False
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+_FETCHER = None
+
+def get_fetcher():
+    global _FETCHER
+    if _FETCHER is None:
+        _FETCHER = Fetcher()
+    return _FETCHER
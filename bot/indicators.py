@@ -0,0 +1,111 @@
+from collections import deque
+from types import SimpleNamespace
+
+from candles import timeframe_ms
+from metrics import timed
+
+# ================= CONFIG =================
+HISTORY = 8  # jumlah candle closed terakhir yang disimpan per state
+
+NAN = float("nan")
+
+# ================= EMA =================
+class Ema:
+    # update O(1) per candle, hasil sama dengan pandas
+    # close.ewm(span=span, adjust=adjust).mean()
+    def __init__(self, span, adjust=False):
+        alpha = 2 / (span + 1)
+        self.factor = 1 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.value = NAN
+        self.old_wt = 1.0
+
+    def _step(self, x):
+        value, old_wt = self.value, self.old_wt
+        if value != value:
+            return x, 1.0
+        if x != x:
+            return value, old_wt
+        old_wt *= self.factor
+        if value != x:
+            value = (old_wt * value + self.new_wt * x) / (old_wt + self.new_wt)
+        old_wt = old_wt + self.new_wt if self.adjust else 1.0
+        return value, old_wt
+
+    def update(self, x):
+        self.value, self.old_wt = self._step(x)
+        return self.value
+
+    def peek(self, x):
+        return self._step(x)[0]
+
+# ================= STATE =================
+class IndicatorState:
+    def __init__(self, spans=(), adjust=False):
+        self.emas = {span: Ema(span, adjust) for span in spans}
+        self.last_time = None
+        self.count = 0                        # jumlah candle closed yang sudah masuk
+        self.closed = deque(maxlen=HISTORY)   # closed[-1] == df.iloc[-2]
+        self.forming = None                   # == df.iloc[-1]
+
+    def _bar(self, row, commit):
+        t, o, h, l, c, v = row[:6]
+        bar = SimpleNamespace(time=t, open=o, high=h, low=l, close=c, volume=v)
+        for span, ema in self.emas.items():
+            setattr(bar, f"ema{span}", ema.update(c) if commit else ema.peek(c))
+        return bar
+
+    def push(self, row):
+        self.closed.append(self._bar(row, True))
+        self.last_time = row[0]
+        self.count += 1
+
+    def set_forming(self, row):
+        self.forming = self._bar(row, False)
+
+# ================= ENGINE =================
+class IndicatorEngine:
+    def __init__(self):
+        self.states = {}
+
+    def update(self, symbol, tf, rows, spans=(), adjust=False):
+        with timed("indicator", tf, symbol):
+            return self._update(symbol, tf, rows, spans, adjust)
+
+    def _update(self, symbol, tf, rows, spans, adjust):
+        # rows: ohlcv urut waktu, bar terakhir dianggap masih forming.
+        # hanya candle closed yang lebih baru dari state yang diproses.
+        key = (symbol, tf, tuple(spans), adjust)
+        state = self.states.get(key)
+        if not len(rows):
+            return state
+
+        closed = rows[:-1]
+        new = closed
+        if state is not None and state.last_time is not None:
+            i = len(closed)
+            while i > 0 and closed[i - 1][0] > state.last_time:
+                i -= 1
+            new = closed[i:]
+            # ada candle yang hilang -> seed ulang dari data yang ada
+            if len(new) and new[0][0] != state.last_time + timeframe_ms(tf):
+                state = None
+                new = closed
+
+        if state is None:
+            state = IndicatorState(spans, adjust)
+            self.states[key] = state
+
+        for row in new:
+            state.push(row)
+        state.set_forming(rows[-1])
+        return state
+
+_ENGINE = None
+
+def get_indicator_engine():
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = IndicatorEngine()
+    return _ENGINE
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from series import COLUMNS
+
+# Semua kernel bekerja di matrix (symbols x candles), kolom terakhir
+# = candle forming, kolom -2 = candle closed terakhir. Symbol dengan
+# data lebih pendek di-pad NaN di kiri.
+
+# ================= MATRIX =================
+def to_matrix(ohlcvs, n=None):
+    # ohlcvs: list ohlcv (list of lists / ndarray) per symbol
+    n = n or max((len(o) for o in ohlcvs), default=0)
+    data = np.full((len(COLUMNS), len(ohlcvs), n), np.nan)
+    lengths = np.zeros(len(ohlcvs), dtype=np.int64)
+
+    for i, rows in enumerate(ohlcvs):
+        a = np.asarray(rows, dtype=np.float64)[-n:]
+        if len(a):
+            data[:, i, n - len(a):] = a[:, :len(COLUMNS)].T
+        lengths[i] = len(a)
+
+    m = {col: data[j] for j, col in enumerate(COLUMNS)}
+    m["length"] = lengths
+    return m
+
+# ================= ROLLING =================
+def _pad(values, n):
+    out = np.full(values.shape[:-1] + (n,), np.nan)
+    out[..., n - values.shape[-1]:] = values
+    return out
+
+def rolling_min(a, window):
+    if a.shape[-1] < window:
+        return np.full(a.shape, np.nan)
+    return _pad(sliding_window_view(a, window, axis=-1).min(axis=-1), a.shape[-1])
+
+def rolling_max(a, window):
+    if a.shape[-1] < window:
+        return np.full(a.shape, np.nan)
+    return _pad(sliding_window_view(a, window, axis=-1).max(axis=-1), a.shape[-1])
+
+def rolling_mean(a, window):
+    if a.shape[-1] < window:
+        return np.full(a.shape, np.nan)
+    return _pad(sliding_window_view(a, window, axis=-1).mean(axis=-1), a.shape[-1])
+
+# ================= STOCHASTIC =================
+def stochastic(high, low, close, k_period=5, d_period=3, smooth=3):
+    low_min = rolling_min(low, k_period)
+    high_max = rolling_max(high, k_period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k_raw = 100 * (close - low_min) / (high_max - low_min)
+
+    k = rolling_mean(k_raw, smooth)
+    d = rolling_mean(k, d_period)
+    return k_raw, k, d
+
+def stoch_signals(m, k_period, d_period, smooth, overbought, oversold, min_len=20):
+    _, k, d = stochastic(m["high"], m["low"], m["close"], k_period, d_period, smooth)
+    if k.shape[-1] < 3:
+        empty = np.zeros(k.shape[0], dtype=bool)
+        return empty, empty
+
+    k2, d2, k3 = k[:, -2], d[:, -2], k[:, -3]
+    valid = m["length"] >= min_len
+
+    # NaN selalu False di perbandingan, sama dengan cek pd.isna
+    ob = valid & (k2 > overbought) & (d2 > overbought) & (k2 < k3)
+    os_ = valid & (k2 < oversold) & (d2 < oversold) & (k2 > k3)
+    return ob, os_
+
+# ================= EMA =================
+def ema(close, span, adjust=False):
+    # pandas ewm(span, adjust).mean() per baris (symbol) sekaligus: satu
+    # DataFrame kolom = symbol, rekurens jalan di cython pandas.
+    # NaN di kiri (padding to_matrix) dilewati seperti pandas
+    close = np.atleast_2d(close)
+    return pd.DataFrame(close.T).ewm(span=span, adjust=adjust).mean().to_numpy().T
+
+def ema_ribbon(close, spans, adjust=False):
+    return {span: ema(close, span, adjust) for span in spans}
+
+# ================= FILTER =================
+def ema_touch(low, high, ema_values, tol):
+    return (low - tol <= ema_values) & (ema_values <= high + tol)
+
+def candle_metrics(open_, high, low, close):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        range_pct = (high - low) / close
+        body_pct = np.abs(close - open_) / close
+    return range_pct, body_pct
+
+def ema_slope_ok(ema_values, min_slope):
+    # slope dari kolom -5 ke -2 (candle closed terakhir)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (ema_values[:, -2] - ema_values[:, -5]) / ema_values[:, -5]
+    return np.abs(slope) >= min_slope
+
+# ================= EMA TOUCH SCAN =================
+def ema_touch_scan(m, spans, tol_pct, min_range, min_body,
+                   min_gap=None, min_slope=None, slope_span=None):
+    # satu pass untuk semua symbol, dievaluasi di candle closed terakhir.
+    # spans[0] vs spans[1] menentukan trend (fast > slow = bullish).
+    emas = ema_ribbon(m["close"], spans)
+
+    o, h, l, c = (m[k][:, -2] for k in ("open", "high", "low", "close"))
+    e = {span: emas[span][:, -2] for span in spans}
+    fast, slow = e[spans[0]], e[spans[1]]
+
+    range_pct, body_pct = candle_metrics(o, h, l, c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ema_gap = np.abs(fast - slow) / c
+
+    tol = c * tol_pct
+    out = {
+        "ema": e,
+        "range_ok": ~(range_pct < min_range),
+        "body_ok": ~(body_pct < min_body),
+        "bullish": fast > slow,
+        "touch": {span: ema_touch(l, h, e[span], tol) for span in spans},
+    }
+    out["active"] = out["range_ok"] & out["body_ok"]
+    if min_gap is not None:
+        out["gap_ok"] = ~(ema_gap < min_gap)
+    if min_slope is not None:
+        out["slope_ok"] = ema_slope_ok(emas[slope_span or spans[1]], min_slope)
+    return out
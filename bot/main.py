@@ -3,44 +3,136 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from config import *
 import scanner, signals
+from fetcher import get_fetcher
+from exchange import ensure_markets, market_refresh_loop
+from delivery import start_delivery, get_delivery
+from pipeline import Pipeline
+from sharding import Coordinator, make_queue
+from candles import timeframe_ms
+from streaming import LIVE_MAX_CHARS, cancel_scan, get_scan_jobs
+import metrics
+from strategies import StochDetector, EmaTouchDetector, StrictEmaTouchDetector, RibbonDetector
+
+# strategy scan: satu pass data untuk semua detector
+pipeline = Pipeline()
+pipeline.register(StochDetector())
+pipeline.register(EmaTouchDetector())
+pipeline.register(StrictEmaTouchDetector())
+pipeline.register(RibbonDetector(SIGNAL_TF, LIMIT, SIGNAL_EMAS))
+
+# SCAN_WORKERS > 0: universe dibagi ke worker, hasil digabung di sini
+coordinator = None
+
+# /scan strategy yang sama di candle yang sama -> satu job
+scan_jobs = get_scan_jobs()
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🤖 COMBINED CRYPTO BOT\n\n"
         "/scan 15m|1h|1d\n"
+        "/scan stoch|ema|ema_strict|ribbon|all\n"
+        "/cancel\n"
         "/autostart 15m\n"
         "/autostop\n"
         "/signalmonitor on|off|btc\n"
-        "/listcoin"
+        "/listcoin\n"
+        "/stats"
     )
 
 async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tf = context.args[0] if context.args else "15m"
-    coins = scanner.get_top_movers()
-    for _, r in coins.iterrows():
-        await scanner.send_chart(context.application, r.symbol, r.change, tf)
+    arg = context.args[0].lower() if context.args else "15m"
+
+    if arg == "all" or arg in pipeline.detectors:
+        await strategy_scan(update, context, None if arg == "all" else [arg])
+        return
+
+    coins = await scanner.get_top_movers()
+    await scanner.send_charts(coins, arg)
+
+async def run_strategy(job, names):
+    label = ", ".join(names or pipeline.detectors).replace("_", "\\_")
+    job.publish(f"⏳ Scanning {label}...")
+    results = await (coordinator or pipeline).run(names)
+
+    # satu pesan live: item per section dikurangi sampai muat
+    for max_items in (20, 10, 5):
+        text = "\n".join(pipeline.format_report(results, max_items))
+        if len(text) <= LIVE_MAX_CHARS:
+            break
+    return text
+
+async def strategy_scan(update, context, names):
+    # single-flight per strategy & candle tf terkecil yang dipakai
+    detectors = [pipeline.detectors[n] for n in (names or pipeline.detectors)]
+    finest = min((tf for d in detectors for tf, _, _ in d.streams), key=timeframe_ms)
+    await scan_jobs.submit(
+        update, context,
+        scan_jobs.key("strategy", ",".join(d.name for d in detectors), finest),
+        lambda job: run_strategy(job, names),
+        "⏳ Scanning...",
+        parse_mode="Markdown"
+    )
 
 async def autostart(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    tf = context.args[0] if context.args else scanner.AUTO_TF
+    if tf not in TF_MAP:
+        await update.message.reply_text("⛔ TF tidak valid")
+        return
+
     scanner.AUTO_SCAN = True
-    scanner.AUTO_TF = context.args[0]
-    scanner.AUTO_INTERVAL = TF_MAP[scanner.AUTO_TF]
+    scanner.AUTO_TF = tf
     await update.message.reply_text("🟢 AUTO SCAN AKTIF")
 
 async def autostop(update: Update, context: ContextTypes.DEFAULT_TYPE):
     scanner.AUTO_SCAN = False
     await update.message.reply_text("🔴 AUTO SCAN OFF")
 
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(metrics.summary(), parse_mode="Markdown")
+
 async def post_init(app):
+    global coordinator
+    start_delivery(
+        app.bot,
+        per_chat_rate=SEND_PER_CHAT_RATE,
+        group_per_min=SEND_GROUP_PER_MIN,
+        global_rate=SEND_GLOBAL_RATE,
+        linger=MEDIA_GROUP_LINGER
+    )
+    if METRICS_PORT:
+        await metrics.start_metrics_server(METRICS_HOST, METRICS_PORT)
+    await ensure_markets()
+    if SCAN_WORKERS:
+        coordinator = Coordinator(
+            pipeline, make_queue(SCAN_WORKER_BACKEND, SCAN_WORKERS, pipeline)
+        )
+        await coordinator.start()
+    app.create_task(market_refresh_loop())
     app.create_task(scanner.scanner_loop(app))
     app.create_task(signals.monitor_loop(app))
 
+async def post_shutdown(app):
+    if coordinator:
+        await coordinator.close()
+    await get_delivery().close()
+    scanner.renderer.shutdown()
+    await get_fetcher().close()
+
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).post_init(post_init).build()
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("scan", scan))
+    app.add_handler(CommandHandler("cancel", cancel_scan))
     app.add_handler(CommandHandler("autostart", autostart))
     app.add_handler(CommandHandler("autostop", autostop))
+    app.add_handler(CommandHandler("stats", stats))
 
     # signal handlers
     app.add_handler(CommandHandler("signalmonitor", signals.signalmonitor))
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+
+log = logging.getLogger("METRICS")
+
+# ================= CONFIG =================
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+# ================= METRICS =================
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, *labels, value=1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, v in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(self.labels, values)} {v}")
+        return lines
+
+class Gauge:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {self.value}"]
+
+class Histogram:
+    # per label: [count per bucket (+Inf di akhir), sum, count]
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value, *labels):
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+    def merged(self, match=lambda values: True):
+        # gabung semua series yang label-nya lolos match
+        counts, total, n = [0] * (len(self.buckets) + 1), 0.0, 0
+        for values, (c, s, k) in self.series.items():
+            if match(values):
+                counts = [a + b for a, b in zip(counts, c)]
+                total += s
+                n += k
+        return counts, total, n
+
+    def quantile(self, q, counts, n):
+        # batas atas bucket tempat kuantil jatuh
+        target, seen = q * n, 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            seen += c
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, n) in sorted(self.series.items()):
+            cum = 0
+            for bound, c in zip(self.buckets + ("+Inf",), counts):
+                cum += c
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cum}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {n}")
+        return lines
+
+STAGE_SECONDS = Histogram(
+    "bot_stage_seconds", "Durasi per stage (fetch, indicator, render, send)", ("stage", "tf")
+)
+SYMBOL_SECONDS = Histogram(
+    "bot_symbol_stage_seconds", "Durasi per stage per symbol", ("stage", "symbol", "tf")
+)
+REQUEST_SECONDS = Histogram(
+    "bot_exchange_request_seconds", "Durasi request exchange", ("method",)
+)
+REQUESTS = Counter(
+    "bot_exchange_requests_total", "Request exchange per hasil", ("method", "status")
+)
+SENDS = Counter(
+    "bot_telegram_sends_total", "Pengiriman Telegram per hasil", ("kind", "status")
+)
+PREFILTER_SKIPS = Counter(
+    "bot_prefilter_skipped_total", "Fetch OHLCV yang dihemat pre-filter ticker per alasan",
+    ("strategy", "reason")
+)
+JOB_RUNS = Counter(
+    "bot_scheduler_runs_total", "Run job candle close per hasil (ok, error, stale, skipped)",
+    ("job", "status")
+)
+
+WEIGHT_RATE = Gauge(
+    "bot_exchange_weight_per_second", "Budget weight/detik adaptive limiter saat ini"
+)
+
+REGISTRY = [
+    STAGE_SECONDS, SYMBOL_SECONDS, REQUEST_SECONDS, REQUESTS, SENDS,
+    PREFILTER_SKIPS, JOB_RUNS, WEIGHT_RATE,
+]
+
+# ================= TIMER =================
+class StageTimer:
+    __slots__ = ("stage", "tf", "symbol", "start")
+
+    def __init__(self, stage, tf="", symbol=None):
+        self.stage = stage
+        self.tf = tf
+        self.symbol = symbol
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.stage, self.tf)
+        if self.symbol is not None:
+            SYMBOL_SECONDS.observe(elapsed, self.stage, self.symbol, self.tf)
+        return False
+
+    # bisa digabung dengan lock: async with lock, timed(...)
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+def timed(stage, tf="", symbol=None):
+    # with timed("fetch", tf, symbol): ...  (boleh membungkus await)
+    return StageTimer(stage, tf, symbol)
+
+# ================= EXPOSITION =================
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def _md(label):
+    # label (fetch_ohlcv, htf_warm, ...) di-escape untuk parse_mode Markdown
+    label = str(label)
+    for ch in ("_", "*", "`", "["):
+        label = label.replace(ch, "\\" + ch)
+    return label
+
+def summary(top=5):
+    # ringkasan untuk /stats (parse_mode Markdown)
+    lines = ["📈 *STATS*", ""]
+    stages = sorted({values[0] for values in STAGE_SECONDS.series})
+    for stage in stages:
+        counts, total, n = STAGE_SECONDS.merged(lambda v: v[0] == stage)
+        p50 = STAGE_SECONDS.quantile(0.5, counts, n)
+        p95 = STAGE_SECONDS.quantile(0.95, counts, n)
+        lines.append(f"• {_md(stage)}: {n}x avg {total / n * 1000:.1f}ms p50≤{p50}s p95≤{p95}s")
+
+    if REQUESTS.series:
+        lines += ["", "*Exchange*", f"• budget: {WEIGHT_RATE.value:.1f} weight/s"]
+        for (method, status), v in sorted(REQUESTS.series.items()):
+            lines.append(f"• {_md(method)} {_md(status)}: {v}")
+
+    if SENDS.series:
+        lines += ["", "*Telegram*"]
+        for (kind, status), v in sorted(SENDS.series.items()):
+            lines.append(f"• {_md(kind)} {_md(status)}: {v}")
+
+    if PREFILTER_SKIPS.series:
+        lines += ["", "*Prefilter (fetch dihemat)*"]
+        for (strategy, reason), v in sorted(PREFILTER_SKIPS.series.items()):
+            lines.append(f"• {_md(strategy)} {_md(reason)}: {v}")
+
+    if JOB_RUNS.series:
+        lines += ["", "*Scheduler*"]
+        for (job, status), v in sorted(JOB_RUNS.series.items()):
+            lines.append(f"• {_md(job)} {_md(status)}: {v}")
+
+    slow = sorted(
+        ((s / n, symbol, tf) for (stage, symbol, tf), (_, s, n) in SYMBOL_SECONDS.series.items()
+         if stage == "fetch"),
+        reverse=True
+    )[:top]
+    if slow:
+        lines += ["", "*Fetch paling lambat*"]
+        for avg, symbol, tf in slow:
+            lines.append(f"• {_md(symbol.split('/')[0])} {_md(tf)}: {avg * 1000:.0f}ms")
+
+    if len(lines) == 2:
+        lines.append("Belum ada data")
+    return "\n".join(lines)
+
+async def _handle(reader, writer):
+    try:
+        request = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request.split()
+        if len(parts) > 1 and parts[1].startswith(b"/metrics"):
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(host="127.0.0.1", port=9108):
+    server = await asyncio.start_server(_handle, host, port)
+    log.info(f"Metrics di http://{host}:{port}/metrics")
+    return server
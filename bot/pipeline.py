@@ -0,0 +1,127 @@
+import asyncio
+import logging
+
+from candles import get_candle_cache
+from tickers import get_ticker_snapshot
+from metrics import timed
+
+log = logging.getLogger("PIPELINE")
+
+REPORT_MAX_ITEMS = 20  # per section, pesan Telegram max 4096 char
+
+def base_name(symbol):
+    return symbol.split("/")[0]
+
+# ================= DETECTOR =================
+class Detector:
+    # strategy mendaftarkan stream (tf, limit, base) yang dibutuhkan.
+    # base != None -> tf di-resample dari candle base di cache; bar
+    # forming-nya bisa telat s/d candles.BASE_MAX_AGE, jadi keputusan
+    # detector diambil dari candle closed (kolom -2)
+    # detect() dapat semua symbol sekaligus: data[tf][symbol] = CandleSeries.
+    # make_prefilter(candles, tickers) opsional: prune symbol sebelum fetch
+    name = None
+    title = None
+    streams = ()
+    top_n = 200
+
+    def detect(self, data, symbols, stats=None):
+        # -> {section: [item, ...]}
+        raise NotImplementedError
+
+# ================= PIPELINE =================
+class Pipeline:
+    def __init__(self, candles=None, tickers=None):
+        self.candles = candles or get_candle_cache()
+        self.tickers = tickers or get_ticker_snapshot()
+        self.detectors = {}
+        self.prefilters = {}
+
+    def register(self, detector):
+        self.detectors[detector.name] = detector
+        return detector
+
+    def universe(self, detectors):
+        # symbol per detector: top volume sesuai top_n masing-masing
+        return {d.name: self.tickers.top_volume(d.top_n) for d in detectors}
+
+    async def prune(self, detectors, symbols):
+        # prefilter per detector, cuma berguna kalau candle cache proses
+        # ini yang dipakai fetch (bukan shard worker)
+        for d in detectors:
+            make = getattr(d, "make_prefilter", None)
+            if make is None:
+                continue
+            if d.name not in self.prefilters:
+                self.prefilters[d.name] = make(self.candles, self.tickers)
+            symbols[d.name], _ = await self.prefilters[d.name].prune(symbols[d.name])
+        return symbols
+
+    def _plan(self, detectors, symbols):
+        # gabung kebutuhan semua detector per tf: limit terbesar & gabungan
+        # symbol. hasil resample sama dengan candle native, jadi cukup
+        # satu detector minta resample
+        plan = {}
+        for d in detectors:
+            for tf, limit, base in d.streams:
+                if tf not in plan:
+                    plan[tf] = [limit, base, {}]
+                p = plan[tf]
+                p[0] = max(p[0], limit)
+                p[1] = p[1] or base
+                p[2].update(dict.fromkeys(symbols[d.name]))
+        return plan
+
+    async def _fetch(self, symbol, tf, limit, base):
+        try:
+            return await self.candles.series(symbol, tf, limit, base=base)
+        except Exception as e:
+            log.warning(f"Fetch {symbol} {tf} gagal: {e}")
+            return None
+
+    async def collect(self, plan):
+        # tiap series di-fetch sekali per cycle. tf native dulu, tf
+        # resample menyusul setelah candle base-nya masuk cache
+        data = {tf: {} for tf in plan}
+        for derived in (False, True):
+            jobs = [
+                (sym, tf)
+                for tf, (_, base, symbols) in plan.items() if bool(base) == derived
+                for sym in symbols
+            ]
+            rows = await asyncio.gather(
+                *(self._fetch(sym, tf, *plan[tf][:2]) for sym, tf in jobs)
+            )
+            for (sym, tf), r in zip(jobs, rows):
+                if r:
+                    data[tf][sym] = r
+        return data
+
+    async def run(self, names=None, symbols=None):
+        # symbols: {detector: [symbol, ...]} dari coordinator (shard),
+        # default top volume dari ticker snapshot
+        detectors = [self.detectors[n] for n in (names or self.detectors)]
+
+        if symbols is None:
+            await self.tickers.refresh()
+            symbols = await self.prune(detectors, self.universe(detectors))
+        data = await self.collect(self._plan(detectors, symbols))
+
+        # fan-out: data yang sama ke semua detector
+        results = {}
+        for d in detectors:
+            with timed("indicator", d.name):
+                results[d.name] = d.detect(data, symbols[d.name])
+            log.info(f"{d.name}: {sum(map(len, results[d.name].values()))} hit")
+        return results
+
+    def format_report(self, results, max_items=REPORT_MAX_ITEMS):
+        # satu pesan per detector
+        messages = []
+        for name, sections in results.items():
+            msg = f"📊 *{self.detectors[name].title}*\n"
+            for section, items in sections.items():
+                msg += f"\n*{section}*\n"
+                msg += (", ".join(items[:max_items]) if items else "- None") + "\n"
+            messages.append(msg)
+        return messages
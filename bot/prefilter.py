@@ -0,0 +1,112 @@
+import logging
+import time
+
+import numpy as np
+
+import kernels
+from candles import current_open, get_candle_cache, last_closed_open, timeframe_ms
+from tickers import get_ticker_snapshot
+from metrics import PREFILTER_SKIPS
+
+log = logging.getLogger("PREFILTER")
+
+# ================= CONFIG =================
+PREFILTER_MAX_AGE = 23 * 3600   # detik, candle yang belum di-cache harus di dalam 24h ticker
+PREFILTER_MARGIN = 0.0005       # kelonggaran high/low ticker (ticker bisa sedikit tertinggal)
+
+# ================= EMA TOUCH =================
+class EmaTouchPrefilter:
+    # buang symbol yang pasti tidak lolos scan EMA touch sebelum fetch
+    # OHLCV, hanya dari ticker snapshot + candle yang sudah di-cache.
+    #
+    # konservatif: candle yang belum di-cache (sejak fetch terakhir)
+    # ada di dalam 24h ticker, jadi close-nya di [low, high] ticker.
+    # EMA naik monoton terhadap tiap close, jadi EMA dengan close
+    # tersebut diisi low / high = batas bawah / atas EMA sebenarnya.
+    # candle closed terakhir juga di dalam [low, high]. symbol hanya
+    # dibuang kalau range 24h < min_range atau tidak ada EMA yang
+    # mungkin tersentuh. tanpa cache / ticker -> selalu di-fetch
+    def __init__(self, name, tf, limit, spans, tol_pct, min_range,
+                 candles=None, tickers=None):
+        self.name = name
+        self.tf = tf
+        self.limit = limit
+        self.spans = spans
+        self.tol_pct = tol_pct
+        self.min_range = min_range
+        self.candles = candles or get_candle_cache()
+        self.tickers = tickers or get_ticker_snapshot()
+
+    def _bounds(self, sym, now_ms):
+        # -> (close matrix row batas bawah, batas atas, low, high) atau None
+        t = self.tickers.usdt.get(sym)
+        ring = self.candles.rings.get((sym, self.tf))
+        if not t or not t.get("high") or not t.get("low") or ring is None:
+            return None
+        if ring.size < self.limit:
+            return None
+
+        step = timeframe_ms(self.tf)
+        last_closed = last_closed_open(self.tf, now_ms)
+        last = ring.last_time()
+        if last > last_closed + step or now_ms - last > PREFILTER_MAX_AGE * 1000:
+            return None
+
+        low = t["low"] * (1 - PREFILTER_MARGIN)
+        high = t["high"] * (1 + PREFILTER_MARGIN)
+
+        # bar terakhir ring waktu di-fetch masih forming -> belum final.
+        # unknown = bar dari situ sampai candle closed terakhir + forming
+        known = ring.view()[:-1, 4]
+        unknown = (last_closed - last) // step + 2
+        lo = np.concatenate([known, np.full(unknown, low)])[-self.limit:]
+        hi = np.concatenate([known, np.full(unknown, high)])[-self.limit:]
+        return lo, hi, low, high
+
+    async def prune(self, symbols):
+        # -> (symbol yang tetap di-fetch, jumlah yang di-skip)
+        if not symbols:
+            return symbols, 0
+
+        # ticker harus lebih baru dari candle close terakhir
+        now_ms = int(time.time() * 1000)
+        since_close = (now_ms - current_open(self.tf, now_ms)) / 1000
+        if time.monotonic() - self.tickers.updated >= since_close:
+            await self.tickers.refresh(force=True)
+
+        now_ms = int(time.time() * 1000)
+        rows, idx = [], []
+        for i, sym in enumerate(symbols):
+            b = self._bounds(sym, now_ms)
+            if b is not None:
+                rows.append(b)
+                idx.append(i)
+
+        if not rows:
+            return symbols, 0
+
+        lo = kernels.ema_ribbon(np.array([r[0] for r in rows]), self.spans)
+        hi = kernels.ema_ribbon(np.array([r[1] for r in rows]), self.spans)
+        low = np.array([r[2] for r in rows])
+        high = np.array([r[3] for r in rows])
+
+        # sama dengan kernels.ema_touch_scan: tol = close * tol_pct,
+        # close <= high
+        tol = high * self.tol_pct
+        touch = np.zeros(len(rows), dtype=bool)
+        for span in self.spans:
+            touch |= (hi[span][:, -2] >= low - tol) & (lo[span][:, -2] <= high + tol)
+        range_ok = ~((high - low) / low < self.min_range)
+
+        drop = set()
+        for j, i in enumerate(idx):
+            if not range_ok[j]:
+                PREFILTER_SKIPS.inc(self.name, "range")
+                drop.add(i)
+            elif not touch[j]:
+                PREFILTER_SKIPS.inc(self.name, "ema")
+                drop.add(i)
+
+        if drop:
+            log.info(f"{self.name}: {len(drop)}/{len(symbols)} symbol di-skip sebelum fetch")
+        return [s for i, s in enumerate(symbols) if i not in drop], len(drop)
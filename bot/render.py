@@ -0,0 +1,68 @@
+import asyncio
+import io
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+# ================= WORKER =================
+def _init_worker():
+    # import berat cukup sekali per proses
+    import matplotlib
+    matplotlib.use("Agg")
+    import mplfinance  # noqa: F401
+
+def render_png(ohlcv, supports, resistances, title):
+    # jalan di proses worker, hasil PNG dikembalikan sebagai bytes.
+    # ohlcv: array n x 6 (CandleSeries.data), DataFrame cuma dibuat di sini
+    import mplfinance as mpf
+    from series import CandleSeries
+
+    df = CandleSeries(ohlcv).to_pandas()
+
+    apds = []
+    for s in supports:
+        apds.append(mpf.make_addplot([s]*len(df), linestyle="--"))
+    for r in resistances:
+        apds.append(mpf.make_addplot([r]*len(df), linestyle="--"))
+
+    buf = io.BytesIO()
+    mpf.plot(
+        df,
+        type="candle",
+        style="charles",
+        volume=True,
+        figsize=(10, 6),
+        addplot=apds,
+        title=title,
+        savefig=dict(fname=buf, format="png", dpi=160, bbox_inches="tight")
+    )
+    return buf.getvalue()
+
+# ================= POOL =================
+class ChartRenderer:
+    def __init__(self, workers=2, queue_depth=8):
+        self.workers = workers
+        self.pool = None
+        # maksimal render yang antri + jalan, producer menunggu kalau penuh
+        self.slots = asyncio.Semaphore(queue_depth)
+
+    def _pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self.pool
+
+    async def render(self, ohlcv, supports, resistances, title):
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            png = await loop.run_in_executor(
+                self._pool(), render_png, ohlcv, supports, resistances, title
+            )
+        return png
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
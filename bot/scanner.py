@@ -1,70 +1,64 @@
 import pandas as pd
-import mplfinance as mpf
-import matplotlib
-matplotlib.use("Agg")
 
-import asyncio, os
+import asyncio
+import logging
 from datetime import datetime
 from config import *
-from exchange import exchange, SYMBOLS
 from utils import calc_support_resistance
+from candles import get_candle_cache, last_closed_open
+from render import ChartRenderer
+from chartcache import ChartCache
+from tickers import get_ticker_snapshot
+from delivery import get_delivery
+from metrics import timed
+from scheduler import run_at_close
 
-AUTO_SCAN = False
-AUTO_TF = "15m"
-AUTO_INTERVAL = TF_MAP[AUTO_TF]
+log = logging.getLogger("SCANNER")
 
-def get_top_movers():
-    tickers = exchange.fetch_tickers(SYMBOLS)
-    data = []
+candles = get_candle_cache()
+tickers = get_ticker_snapshot()
+renderer = ChartRenderer(RENDER_WORKERS, RENDER_QUEUE_DEPTH)
+chart_cache = ChartCache(CHART_CACHE_SIZE)
 
-    for sym, t in tickers.items():
-        pct = t.get("percentage")
-        if pct is None or abs(pct) < MIN_MOVE_PCT:
-            continue
-
-        data.append({
-            "symbol": sym,
-            "change": pct,
-            "volume": t.get("quoteVolume") or 0
-        })
+AUTO_SCAN = False
+AUTO_TF = "15m"
 
-    df = pd.DataFrame(data)
-    if df.empty:
-        return df
+async def get_top_movers():
+    await tickers.refresh()
+    return pd.DataFrame(
+        tickers.movers(MIN_MOVE_PCT, pool=30, n=TOP_N),
+        columns=["symbol", "change", "volume"]
+    )
 
-    df = df.sort_values("volume", ascending=False).head(30)
-    return df.sort_values("change", ascending=False).head(TOP_N)
+async def build_chart(symbol, change, tf):
+    # change dibulatkan seperti yang ditampilkan (+1.23%)
+    change = round(change, 2)
 
-async def send_chart(app, symbol, change, tf):
-    ohlcv = exchange.fetch_ohlcv(symbol, tf, limit=LIMIT)
-    df = pd.DataFrame(
-        ohlcv,
-        columns=["time","open","high","low","close","volume"]
-    )
-    df["time"] = pd.to_datetime(df["time"], unit="ms")
-    df.set_index("time", inplace=True)
+    # candle belum close & change sama sejak render terakhir -> dari memory
+    cached = chart_cache.find(symbol, tf, last_closed_open(tf), change)
+    if cached:
+        return cached
 
-    supports, resistances = calc_support_resistance(df)
+    series = await candles.series(symbol, tf, LIMIT)
+    if len(series) < 2:
+        # listing baru: belum ada candle closed
+        log.warning(f"Chart {symbol} {tf} dilewati: candle kurang")
+        return None
+    supports, resistances = calc_support_resistance(series)
 
-    apds = []
-    for s in supports:
-        apds.append(mpf.make_addplot([s]*len(df), linestyle="--"))
-    for r in resistances:
-        apds.append(mpf.make_addplot([r]*len(df), linestyle="--"))
+    key = (symbol, tf, int(series.time[-2]), change, tuple(supports), tuple(resistances))
+    cached = chart_cache.get(key)
+    if cached:
+        return cached
 
     label = "GAINER 🚀" if change > 0 else "LOSER 🔻"
-    fname = symbol.replace("/", "").replace(":", "") + f"_{tf}.png"
-
-    mpf.plot(
-        df,
-        type="candle",
-        style="charles",
-        volume=True,
-        figsize=(10, 6),
-        addplot=apds,
-        title=f"{symbol} | {tf.upper()} | {label} {change:+.2f}%",
-        savefig=dict(fname=fname, dpi=160, bbox_inches="tight")
-    )
+
+    # render di process pool, PNG langsung di memory
+    with timed("render", tf, symbol):
+        png = await renderer.render(
+            series.data, supports, resistances,
+            f"{symbol} | {tf.upper()} | {label} {change:+.2f}%"
+        )
 
     caption = (
         f"📊 {symbol}\n"
@@ -75,20 +69,33 @@ async def send_chart(app, symbol, change, tf):
         f"{datetime.now().strftime('%Y-%m-%d %H:%M')}"
     )
 
-    with open(fname, "rb") as img:
-        await app.bot.send_photo(chat_id=TARGET, photo=img, caption=caption)
+    chart_cache.put(key, (png, caption))
+    return png, caption
+
+async def build_charts(coins, tf):
+    return await asyncio.gather(
+        *(build_chart(r.symbol, r.change, tf) for _, r in coins.iterrows())
+    )
+
+async def send_charts(coins, tf, chat_id=TARGET):
+    # enqueue saja, delivery queue yang atur rate limit & album
+    delivery = get_delivery()
+    for chart in await build_charts(coins, tf):
+        if chart:
+            delivery.send_photo(chat_id, *chart)
+
+async def send_chart(app, symbol, change, tf):
+    chart = await build_chart(symbol, change, tf)
+    if chart:
+        get_delivery().send_photo(TARGET, *chart)
 
-    os.remove(fname)
+async def auto_scan_once():
+    coins = await get_top_movers()
+    await send_charts(coins, AUTO_TF)
 
 async def scanner_loop(app):
-    global AUTO_SCAN
-    await asyncio.sleep(5)
-    while True:
-        if AUTO_SCAN:
-            coins = get_top_movers()
-            for _, r in coins.iterrows():
-                await send_chart(app, r.symbol, r.change, AUTO_TF)
-                await asyncio.sleep(SEND_DELAY)
-            await asyncio.sleep(AUTO_INTERVAL)
-        else:
-            await asyncio.sleep(2)
+    # jalan tepat di tiap close AUTO_TF, durasi scan tidak menggeser jadwal
+    await run_at_close(
+        "autoscan", lambda: AUTO_TF, auto_scan_once,
+        settle=SCHEDULE_SETTLE, active=lambda: AUTO_SCAN
+    )
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+
+from candles import timeframe_ms
+from metrics import JOB_RUNS, timed
+
+log = logging.getLogger("SCHEDULER")
+
+# ================= CONFIG =================
+CLOSE_SETTLE = 5     # detik setelah candle close, tunggu exchange finalisasi candle
+STALE_AFTER = 0.5    # bangun telat > fraksi interval ini -> run dianggap basi
+
+def next_close(tf, settle=CLOSE_SETTLE, now=None):
+    # waktu (epoch detik) candle tf berikutnya close + settle, candle UTC
+    step = timeframe_ms(tf) / 1000
+    now = time.time() if now is None else now
+    return (now - settle) // step * step + step + settle
+
+# ================= CANDLE CLOSE JOB =================
+async def run_at_close(name, tf, job, settle=CLOSE_SETTLE, active=None):
+    # job() jalan tepat di tiap candle close tf (+ settle), bukan interval
+    # setelah job selesai, jadi jadwal tidak geser. tf boleh callable
+    # (tf bisa diganti lewat command). job lewat close berikutnya ->
+    # close yang terlewat di-skip, tidak diantrikan
+    while True:
+        current = tf() if callable(tf) else tf
+        step = timeframe_ms(current) / 1000
+        due = next_close(current, settle)
+        await asyncio.sleep(max(0, due - time.time()))
+
+        if active is not None and not active():
+            continue
+
+        late = time.time() - due
+        if late > step * STALE_AFTER:
+            JOB_RUNS.inc(name, "stale")
+            log.warning(f"{name} {current}: bangun telat {late:.1f}s, run di-skip")
+            continue
+
+        try:
+            with timed("job", name):
+                await job()
+            JOB_RUNS.inc(name, "ok")
+        except Exception as e:
+            JOB_RUNS.inc(name, "error")
+            log.exception(f"{name} {current} gagal: {e}")
+
+        missed = int((time.time() - settle) // step - (due - settle) // step)
+        if missed > 0:
+            JOB_RUNS.inc(name, "skipped", value=missed)
+            log.warning(f"{name} {current}: overrun {time.time() - due:.1f}s, {missed} close di-skip")
+
+# ================= SPREAD =================
+async def spread(items, fn, over):
+    # fn(item) dimulai bertahap sepanjang `over` detik (offset tetap per
+    # posisi), supaya request tidak menumpuk di detik pertama setelah
+    # close. hasil urut sesuai items, error dikembalikan sebagai exception
+    step = over / len(items) if items else 0
+
+    async def delayed(i, item):
+        if i:
+            await asyncio.sleep(i * step)
+        return await fn(item)
+
+    return await asyncio.gather(
+        *(delayed(i, item) for i, item in enumerate(items)), return_exceptions=True
+    )
@@ -0,0 +1,88 @@
+import numpy as np
+
+# urutan kolom ohlcv ccxt, dipakai series, kernels, candles & store
+COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+# ================= CANDLE SERIES =================
+class CandleSeries:
+    # candle ohlcv sebagai kolom numpy contiguous (array n x 6 urutan
+    # Fortran), pengganti DataFrame per fetch. slicing = view tanpa copy,
+    # pandas hanya dibuat kalau perlu (mplfinance)
+    __slots__ = ("data",)
+
+    def __init__(self, rows):
+        data = np.asarray(rows, dtype=np.float64)
+        if data.ndim != 2:
+            data = data.reshape(-1, len(COLUMNS))
+        # satu copy ke kolom contiguous, kecuali sudah kolom contiguous
+        self.data = data if data.strides[0] == data.itemsize else np.asfortranarray(data)
+
+    @classmethod
+    def _view(cls, data):
+        series = object.__new__(cls)
+        series.data = data
+        return series
+
+    # ================= COLUMNS =================
+    @property
+    def time(self):
+        return self.data[:, 0]
+
+    @property
+    def open(self):
+        return self.data[:, 1]
+
+    @property
+    def high(self):
+        return self.data[:, 2]
+
+    @property
+    def low(self):
+        return self.data[:, 3]
+
+    @property
+    def close(self):
+        return self.data[:, 4]
+
+    @property
+    def volume(self):
+        return self.data[:, 5]
+
+    # ================= ACCESS =================
+    def __len__(self):
+        return len(self.data)
+
+    def __array__(self, dtype=None, copy=None):
+        # np.asarray(series) / kernels.to_matrix tanpa copy
+        return self.data if dtype is None else self.data.astype(dtype, copy=False)
+
+    def __iter__(self):
+        # per bar sebagai list float python (loop scalar lebih cepat)
+        return iter(self.data.tolist())
+
+    def __getitem__(self, key):
+        # slice -> CandleSeries view, int -> satu bar (t, o, h, l, c, v)
+        if isinstance(key, slice):
+            return self._view(self.data[key])
+        return self.data[key]
+
+    @property
+    def closed(self):
+        # tanpa bar terakhir (candle yang masih forming)
+        return self[:-1]
+
+    def tail(self, n):
+        return self[-n:] if n else self[:0]
+
+    # ================= CONVERSION =================
+    def tolist(self):
+        return self.data.tolist()
+
+    def to_pandas(self):
+        # DataFrame index waktu (format mplfinance)
+        import pandas as pd
+
+        df = pd.DataFrame(self.data[:, 1:], columns=COLUMNS[1:])
+        df.index = pd.to_datetime(self.time.astype(np.int64), unit="ms")
+        df.index.name = "time"
+        return df
@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import zlib
+
+from pipeline import Pipeline, base_name
+
+log = logging.getLogger("SHARDING")
+
+# ================= CONFIG =================
+WORKER_TIMEOUT = 600   # detik per shard, worker hang -> shard dianggap gagal
+WORKER_CHECK = 1       # detik antar cek process worker masih hidup
+INCOMPLETE = "⚠️ Hasil tidak lengkap"   # section report untuk shard yang gagal
+
+def shard_of(symbol, count):
+    # hash stabil: symbol selalu ke worker yang sama, cache worker tetap warm
+    return zlib.crc32(symbol.encode()) % count
+
+# ================= QUEUES =================
+# queue = cara coordinator mengirim task shard ke worker:
+#   workers            jumlah shard
+#   await start()      siapkan worker
+#   await run(i, task) -> hasil Pipeline.run untuk shard i
+#   await close()
+# backend lain (mis. broker antar host) cukup implement 4 hal ini
+
+class LocalQueue:
+    # stand-in in-process: semua shard jalan di event loop bot dengan
+    # pipeline yang sama. untuk dev / test jalur coordinator tanpa process
+    def __init__(self, workers, pipeline):
+        self.workers = workers
+        self.pipeline = pipeline
+
+    async def start(self):
+        pass
+
+    async def run(self, shard, task):
+        return await self.pipeline.run(task["names"], task["symbols"])
+
+    async def close(self):
+        pass
+
+class ProcessQueue:
+    # satu process per shard, masing-masing event loop, exchange client,
+    # candle cache & store sendiri. share: bagian rate limit per worker
+    # (process di host yang sama berbagi limit IP yang sama)
+    def __init__(self, workers, detectors, share=None, timeout=WORKER_TIMEOUT):
+        self.workers = workers
+        self.detectors = detectors
+        self.share = share or 1 / workers
+        self.timeout = timeout
+        self.ctx = mp.get_context("spawn")
+        self.outbox = self.ctx.Queue()
+        self.inboxes = [None] * workers
+        self.procs = [None] * workers
+        self.pending = {}   # task_id -> (shard, future)
+        self.ids = itertools.count()
+        self.loop = None
+        self.reader = None
+        self.watcher = None
+
+    def _spawn(self, i):
+        # inbox baru: task yang belum diambil worker lama sudah digagalkan
+        self.inboxes[i] = self.ctx.Queue()
+        self.procs[i] = self.ctx.Process(
+            target=worker_main,
+            args=(i, self.workers, self.detectors, self.share, self.inboxes[i], self.outbox),
+            name=f"scan-worker-{i}",
+            daemon=True
+        )
+        self.procs[i].start()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        for i in range(self.workers):
+            self._spawn(i)
+        self.reader = threading.Thread(target=self._read, name="scan-results", daemon=True)
+        self.reader.start()
+        self.watcher = asyncio.ensure_future(self._watch())
+        log.info(f"{self.workers} scan worker jalan")
+
+    def _read(self):
+        # thread: mp.Queue.get blocking, hasil dioper ke event loop
+        while True:
+            item = self.outbox.get()
+            if item is None:
+                return
+            self.loop.call_soon_threadsafe(self._resolve, *item)
+
+    def _resolve(self, task_id, ok, payload):
+        _, fut = self.pending.pop(task_id, (None, None))
+        if fut is None or fut.done():
+            return
+        if ok:
+            fut.set_result(payload)
+        else:
+            fut.set_exception(RuntimeError(payload))
+
+    def _check(self, i):
+        # worker mati (OOM, segfault, kill) -> task shard-nya langsung
+        # gagal, tidak menunggu timeout, dan process diganti
+        p = self.procs[i]
+        if p.is_alive():
+            return
+        log.warning(f"Worker {i} mati (exit {p.exitcode}), dijalankan ulang")
+        for task_id, (shard, fut) in list(self.pending.items()):
+            if shard == i:
+                del self.pending[task_id]
+                if not fut.done():
+                    fut.set_exception(RuntimeError(f"worker {i} mati (exit {p.exitcode})"))
+        self._spawn(i)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(WORKER_CHECK)
+            for i in range(self.workers):
+                self._check(i)
+
+    async def run(self, shard, task):
+        self._check(shard)
+        task_id = next(self.ids)
+        fut = self.loop.create_future()
+        self.pending[task_id] = (shard, fut)
+        self.inboxes[shard].put((task_id, task))
+        try:
+            return await asyncio.wait_for(fut, self.timeout)
+        finally:
+            self.pending.pop(task_id, None)
+
+    async def close(self):
+        if self.watcher:
+            self.watcher.cancel()
+            await asyncio.gather(self.watcher, return_exceptions=True)
+        for q in self.inboxes:
+            q.put(None)
+        self.outbox.put(None)
+        for p in self.procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+def make_queue(backend, workers, pipeline):
+    if backend == "local":
+        return LocalQueue(workers, pipeline)
+    if backend == "process":
+        return ProcessQueue(workers, list(pipeline.detectors.values()))
+    raise ValueError(f"Scan worker backend tidak dikenal: {backend}")
+
+# ================= WORKER =================
+def worker_main(index, count, detectors, share, inbox, outbox):
+    # entry point process worker
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s | %(levelname)s | worker{index} | %(message)s",
+        datefmt="%H:%M:%S"
+    )
+
+    from fetcher import (
+        AdaptiveBudget, get_fetcher, WEIGHT_PER_SECOND, WEIGHT_BURST, WEIGHT_MIN, WEIGHT_MAX
+    )
+    from candles import CandleCache
+    from exchange import ensure_markets
+    from store import CandleStore, STORE_DIR
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    fetcher = get_fetcher()
+    fetcher.budget = AdaptiveBudget(
+        WEIGHT_PER_SECOND * share, max(WEIGHT_BURST * share, 2),
+        min_rate=WEIGHT_MIN * share, max_rate=WEIGHT_MAX * share
+    )
+
+    # store terpisah per shard: process lain tidak menulis file yang sama
+    store = CandleStore(os.path.join(STORE_DIR, f"shard-{index}-of-{count}"))
+    pipeline = Pipeline(candles=CandleCache(fetcher, store))
+    for d in detectors:
+        pipeline.register(d)
+
+    try:
+        loop.run_until_complete(ensure_markets())
+    except Exception as e:
+        # fetch pertama akan load markets lagi
+        log.warning(f"Worker {index} gagal load markets: {e}")
+
+    try:
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            task_id, task = item
+            try:
+                result = loop.run_until_complete(pipeline.run(task["names"], task["symbols"]))
+                outbox.put((task_id, True, result))
+            except Exception as e:
+                log.exception(f"Shard {index} gagal")
+                outbox.put((task_id, False, repr(e)))
+    finally:
+        loop.run_until_complete(fetcher.close())
+        loop.close()
+
+# ================= COORDINATOR =================
+class Coordinator:
+    # bagi universe symbol ke shard, kirim lewat queue, gabung hasil
+    # parsial jadi satu hasil dengan format Pipeline.run
+    def __init__(self, pipeline, queue):
+        self.pipeline = pipeline
+        self.queue = queue
+
+    async def start(self):
+        await self.queue.start()
+
+    async def close(self):
+        await self.queue.close()
+
+    async def run(self, names=None):
+        names = list(names or self.pipeline.detectors)
+        detectors = [self.pipeline.detectors[n] for n in names]
+
+        tickers = self.pipeline.tickers
+        await tickers.refresh()
+        universe = self.pipeline.universe(detectors)
+
+        count = self.queue.workers
+        tasks = []
+        for i in range(count):
+            symbols = {
+                name: [s for s in syms if shard_of(s, count) == i]
+                for name, syms in universe.items()
+            }
+            if any(symbols.values()):
+                tasks.append((i, {"names": names, "symbols": symbols}))
+
+        parts = await asyncio.gather(
+            *(self._run_shard(i, task) for i, task in tasks), return_exceptions=True
+        )
+
+        # item diawali base symbol -> urut ulang sesuai ranking volume global
+        rank = {base_name(s): r for r, s in enumerate(tickers.by_volume)}
+        results = {name: {} for name in names}
+        failed = []
+        for (i, _), part in zip(tasks, parts):
+            if isinstance(part, BaseException):
+                log.warning(f"Shard {i + 1}/{count} gagal: {part!r}")
+                failed.append(i)
+                continue
+            for name, sections in part.items():
+                for section, items in sections.items():
+                    results[name].setdefault(section, []).extend(items)
+
+        for sections in results.values():
+            for items in sections.values():
+                items.sort(key=lambda item: rank.get(item.split(" ", 1)[0], len(rank)))
+
+        # report tidak boleh terlihat lengkap kalau ada shard yang hilang
+        if failed:
+            for sections in results.values():
+                sections[INCOMPLETE] = [
+                    f"shard {i + 1}/{count} gagal, hasil tidak lengkap" for i in failed
+                ]
+        return results
+
+    async def _run_shard(self, i, task):
+        # shard gagal (worker error / mati / timeout) dicoba sekali di
+        # process ini sebelum dianggap hilang
+        try:
+            return await self.queue.run(i, task)
+        except Exception as e:
+            log.warning(f"Shard {i + 1}/{self.queue.workers} gagal di worker, coba lokal: {e!r}")
+            return await self.pipeline.run(task["names"], task["symbols"])
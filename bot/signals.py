@@ -1,27 +1,35 @@
-import pandas as pd
-import asyncio, time
+import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from config import *
-from exchange import exchange, symbol_available
+from exchange import symbol_available
+from candles import get_candle_cache
+from indicators import get_indicator_engine
+from delivery import get_delivery
+from scheduler import run_at_close, spread
+from subscriptions import get_subscriptions
 
-WATCHLIST = ["BTC/USDT:USDT", "ETH/USDT:USDT"]
+log = logging.getLogger("SIGNALS")
+
+candles = get_candle_cache()
+indicators = get_indicator_engine()
+
+subscriptions = get_subscriptions()
+
+# belum ada file subscription -> watchlist awal untuk chat TARGET
+DEFAULT_WATCHLIST = ["BTC/USDT:USDT", "ETH/USDT:USDT"]
+if not subscriptions.loaded:
+    for sym in DEFAULT_WATCHLIST:
+        subscriptions.subscribe(TARGET, sym, save=False)
 
 MONITOR_ON = False
 MONITOR_MODE = "ALL"
 MONITOR_SYMBOL = None
 LAST_SIGNAL_TIME = {}
 
-def calc_indicators(df):
-    df["ema9"] = df.close.ewm(span=9).mean()
-    df["ema26"] = df.close.ewm(span=26).mean()
-    df["ema50"] = df.close.ewm(span=50).mean()
-    df["ema200"] = df.close.ewm(span=200).mean()
-    return df
-
-def check_signal(df):
-    last = df.iloc[-1]
+def check_signal(last):
+    # last: bar (df.iloc[-2] atau state.closed[-1])
     if last.ema9 > last.ema26 > last.ema50 > last.ema200:
         return "BUY"
     if last.ema9 < last.ema26 < last.ema50 < last.ema200:
@@ -62,47 +70,59 @@ async def signalmonitor(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"🟢 Signal monitor aktif\n{symbol}")
 
 async def listcoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("📌 WATCHLIST:\n" + "\n".join(WATCHLIST))
+    symbols = subscriptions.symbols(update.effective_chat.id)
+    await update.message.reply_text("📌 WATCHLIST:\n" + ("\n".join(symbols) or "- kosong"))
 
 async def addcoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         return
     symbol = f"{context.args[0].upper()}/USDT:USDT"
-    if symbol not in WATCHLIST:
-        WATCHLIST.append(symbol)
+    subscriptions.subscribe(update.effective_chat.id, symbol)
     await update.message.reply_text(f"✅ Ditambahkan: {symbol}")
 
 async def delcoin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         return
     symbol = f"{context.args[0].upper()}/USDT:USDT"
-    if symbol in WATCHLIST:
-        WATCHLIST.remove(symbol)
+    subscriptions.unsubscribe(update.effective_chat.id, symbol)
     await update.message.reply_text(f"🗑️ Dihapus: {symbol}")
 
+async def check_symbol(sym):
+    # satu fetch & evaluasi per symbol, hasil dikirim ke semua subscriber
+    series = await candles.series(sym, SIGNAL_TF, LIMIT)
+    state = indicators.update(
+        sym, SIGNAL_TF, series, spans=SIGNAL_EMAS, adjust=True
+    )
+    if not state or not state.closed:
+        return
+
+    # signal hanya berubah saat candle close
+    bar = state.closed[-1]
+    signal = check_signal(bar)
+
+    if signal:
+        # cooldown dihitung dari waktu candle, bukan jam dinding, jadi
+        # run tepat tiap close tidak kena jitter beberapa ms
+        t = bar.time / 1000
+        if t - LAST_SIGNAL_TIME.get(sym, 0) >= SIGNAL_COOLDOWN:
+            LAST_SIGNAL_TIME[sym] = t
+            # mode SINGLE boleh symbol tanpa subscriber -> ke TARGET
+            text = f"🚨 {signal} SIGNAL\n{sym}\nTF: 15M"
+            delivery = get_delivery()
+            for chat in subscriptions.chats(sym) or (TARGET,):
+                delivery.send_message(chat, text)
+
+async def monitor_once(app, over=0):
+    # cek disebar sepanjang `over` detik, pacing oleh adaptive limiter
+    symbols = subscriptions.symbols() if MONITOR_MODE == "ALL" else [MONITOR_SYMBOL]
+    results = await spread(symbols, check_symbol, over)
+    for sym, r in zip(symbols, results):
+        if isinstance(r, Exception):
+            log.warning(f"Signal {sym} gagal: {r}")
+
 async def monitor_loop(app):
-    await asyncio.sleep(5)
-    while True:
-        if MONITOR_ON:
-            symbols = WATCHLIST if MONITOR_MODE == "ALL" else [MONITOR_SYMBOL]
-            for sym in symbols:
-                df = pd.DataFrame(
-                    exchange.fetch_ohlcv(sym, TF_SIGNAL, limit=LIMIT),
-                    columns=["time","open","high","low","close","volume"]
-                )
-                df["time"] = pd.to_datetime(df["time"], unit="ms")
-                df.set_index("time", inplace=True)
-
-                df = calc_indicators(df)
-                signal = check_signal(df)
-
-                if signal:
-                    now = time.time()
-                    if now - LAST_SIGNAL_TIME.get(sym, 0) > SIGNAL_COOLDOWN:
-                        LAST_SIGNAL_TIME[sym] = now
-                        await app.bot.send_message(
-                            chat_id=TARGET,
-                            text=f"🚨 {signal} SIGNAL\n{sym}\nTF: 15M"
-                        )
-                await asyncio.sleep(2)
-        await asyncio.sleep(5)
+    # bangun di tiap close SIGNAL_TF, bukan polling
+    await run_at_close(
+        "signals", SIGNAL_TF, lambda: monitor_once(app, SIGNAL_SPREAD),
+        settle=SCHEDULE_SETTLE, active=lambda: MONITOR_ON
+    )
@@ -0,0 +1,209 @@
+import fcntl
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+
+from series import COLUMNS
+
+log = logging.getLogger("STORE")
+
+# ================= CONFIG =================
+STORE_DIR = os.getenv(
+    "CANDLE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "candles")
+)
+MAX_ROWS = 2000  # compaction saat > 2x ini, sisa MAX_ROWS bar terakhir
+
+DTYPES = {c: np.float64 for c in COLUMNS}
+DTYPES["time"] = np.int64
+
+def _name(symbol):
+    return symbol.replace("/", "_").replace(":", "_")
+
+# ================= COLUMNAR STORE =================
+class CandleStore:
+    # satu file per kolom per (symbol, tf): <root>/<tf>/<symbol>/<kolom>.bin
+    # isi fixed-width (int64 / float64), cuma candle closed, append-only.
+    # baca lewat np.memmap jadi view tanpa copy.
+    #
+    # beberapa process (stoch, pencaricoin, signalmonitor, main) boleh
+    # berbagi root: tulis (append / drop / compaction) di bawah flock
+    # <root>/<tf>/<symbol>.lock dan panjang selalu di-stat ulang, tidak
+    # di-cache. method blocking, panggil lewat asyncio.to_thread
+    def __init__(self, root=STORE_DIR, max_rows=MAX_ROWS):
+        self.root = root
+        self.max_rows = max_rows
+        self.maps = {}
+
+    def _dir(self, symbol, tf):
+        return os.path.join(self.root, tf, _name(symbol))
+
+    def _path(self, symbol, tf, col):
+        return os.path.join(self._dir(symbol, tf), f"{col}.bin")
+
+    @contextmanager
+    def _lock(self, symbol, tf):
+        # di luar direktori series, compaction me-rename direktori
+        os.makedirs(os.path.join(self.root, tf), exist_ok=True)
+        with open(self._dir(symbol, tf) + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sizes(self, symbol, tf):
+        sizes = []
+        for c in COLUMNS:
+            try:
+                sizes.append(os.path.getsize(self._path(symbol, tf, c)) // 8)
+            except OSError:
+                sizes.append(0)
+        return sizes
+
+    def _repair(self, symbol, tf):
+        # dipanggil di bawah lock
+        d = self._dir(symbol, tf)
+
+        # compaction terputus di tengah rename -> pakai versi lama
+        if not os.path.isdir(d) and os.path.isdir(d + ".old"):
+            os.replace(d + ".old", d)
+
+        sizes = self._sizes(symbol, tf)
+        n = min(sizes)
+
+        # append terputus -> potong semua kolom ke panjang yang sama
+        if n != max(sizes):
+            log.warning(f"{symbol} {tf} kolom tidak sejajar, dipotong ke {n}")
+            for c in COLUMNS:
+                path = self._path(symbol, tf, c)
+                if os.path.exists(path):
+                    os.truncate(path, n * 8)
+        return n
+
+    def length(self, symbol, tf):
+        # bar lengkap (semua kolom), process lain bisa sedang append
+        return min(self._sizes(symbol, tf))
+
+    def columns(self, symbol, tf):
+        # dict kolom -> memmap read-only, di-map ulang kalau panjang / file
+        # berubah (compaction process lain mengganti file)
+        n = self.length(symbol, tf)
+        if not n:
+            return None
+
+        try:
+            ino = os.stat(self._path(symbol, tf, "time")).st_ino
+            key = (symbol, tf)
+            cached = self.maps.get(key)
+            if cached and cached[:2] == (n, ino):
+                return cached[2]
+
+            cols = {
+                c: np.memmap(self._path(symbol, tf, c), dtype=DTYPES[c], mode="r", shape=(n,))
+                for c in COLUMNS
+            }
+        except (OSError, ValueError):
+            # file diganti di tengah baca (compaction / drop)
+            return None
+        self.maps[key] = (n, ino, cols)
+        return cols
+
+    def last_time(self, symbol, tf):
+        cols = self.columns(symbol, tf)
+        return None if cols is None else int(cols["time"][-1])
+
+    def tail(self, symbol, tf, n):
+        # view n bar terakhir per kolom (zero-copy)
+        cols = self.columns(symbol, tf)
+        if cols is None:
+            return None
+        return {c: v[-n:] for c, v in cols.items()}
+
+    def rows(self, symbol, tf, n):
+        # array (n, 6) float64, format sama dengan CandleRing
+        cols = self.tail(symbol, tf, n)
+        if cols is None:
+            return np.empty((0, len(COLUMNS)))
+        return np.column_stack([cols[c].astype(np.float64) for c in COLUMNS])
+
+    def _last_time(self, symbol, tf, n):
+        # baca langsung dari file (bukan memmap cache), di bawah lock
+        if not n:
+            return None
+        with open(self._path(symbol, tf, "time"), "rb") as f:
+            f.seek((n - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+
+    def append(self, symbol, tf, rows, step=None):
+        # append atomik terhadap process lain: bar yang tidak lebih baru
+        # dari isi store diabaikan, step: kalau ada lubang antara isi
+        # store dan rows, store dimulai ulang (harus bersambung)
+        rows = np.asarray(rows, dtype=np.float64)
+        if not len(rows):
+            return 0
+
+        with self._lock(symbol, tf):
+            n = self._repair(symbol, tf)
+            last = self._last_time(symbol, tf, n)
+            if last is not None and step and rows[0, 0] > last + step:
+                self._drop(symbol, tf)
+                n, last = 0, None
+            if last is not None:
+                rows = rows[rows[:, 0] > last]
+                if not len(rows):
+                    return 0
+
+            os.makedirs(self._dir(symbol, tf), exist_ok=True)
+            for i, c in enumerate(COLUMNS):
+                with open(self._path(symbol, tf, c), "ab") as f:
+                    rows[:, i].astype(DTYPES[c]).tofile(f)
+
+            if n + len(rows) > 2 * self.max_rows:
+                self._compact(symbol, tf)
+        return len(rows)
+
+    def compact(self, symbol, tf, keep=None):
+        with self._lock(symbol, tf):
+            self._repair(symbol, tf)
+            self._compact(symbol, tf, keep)
+
+    def _compact(self, symbol, tf, keep=None):
+        # tulis ulang `keep` bar terakhir ke direktori baru lalu swap
+        keep = keep or self.max_rows
+        cols = self.columns(symbol, tf)
+        if cols is None or len(cols["time"]) <= keep:
+            return
+
+        d = self._dir(symbol, tf)
+        new = d + ".compact"
+        shutil.rmtree(new, ignore_errors=True)
+        os.makedirs(new)
+        for c in COLUMNS:
+            np.asarray(cols[c][-keep:]).tofile(os.path.join(new, f"{c}.bin"))
+
+        self.maps.pop((symbol, tf), None)
+        shutil.rmtree(d + ".old", ignore_errors=True)
+        os.replace(d, d + ".old")
+        os.replace(new, d)
+        shutil.rmtree(d + ".old", ignore_errors=True)
+        log.info(f"{symbol} {tf} compacted ke {keep} bar")
+
+    def drop(self, symbol, tf):
+        with self._lock(symbol, tf):
+            self._drop(symbol, tf)
+
+    def _drop(self, symbol, tf):
+        self.maps.pop((symbol, tf), None)
+        shutil.rmtree(self._dir(symbol, tf), ignore_errors=True)
+
+_STORE = None
+
+def get_candle_store():
+    global _STORE
+    if _STORE is None:
+        _STORE = CandleStore()
+    return _STORE
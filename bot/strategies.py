@@ -0,0 +1,220 @@
+import numpy as np
+
+import kernels
+from candles import last_closed_open
+from pipeline import Detector, base_name
+from prefilter import EmaTouchPrefilter
+
+# ================= STOCHASTIC OB / OS =================
+class StochDetector(Detector):
+    name = "stoch"
+
+    def __init__(self, timeframes=("5m", "15m", "1h", "1d"), limit=50,
+                 k=5, d=3, smooth=3, overbought=83, oversold=10,
+                 resample_from=None, top_n=400):
+        # 15m & 1h dari candle 5m, 1d native
+        resample_from = resample_from or {"15m": "5m", "1h": "5m"}
+        self.title = f"STOCHASTIC KDJ ({k},{d},{smooth}) OB > {overbought} | OS < {oversold}"
+        self.streams = tuple((tf, limit, resample_from.get(tf)) for tf in timeframes)
+        self.limit = limit
+        self.params = (k, d, smooth, overbought, oversold)
+        self.top_n = top_n
+
+    def signals(self, data, symbols):
+        # -> [(tf, "overbought" / "oversold", symbol), ...] urut tf
+        hits = []
+        for tf, _, _ in self.streams:
+            got = [s for s in symbols if data[tf].get(s)]
+            if not got:
+                continue
+
+            m = kernels.to_matrix([data[tf][s] for s in got], self.limit)
+            ob, os_ = kernels.stoch_signals(m, *self.params, min_len=20)
+
+            hits += [(tf, "overbought", s) for s, hit in zip(got, ob) if hit]
+            hits += [(tf, "oversold", s) for s, hit in zip(got, os_) if hit]
+        return hits
+
+    def detect(self, data, symbols, stats=None):
+        out = {}
+        for tf, _, _ in self.streams:
+            if any(data[tf].get(s) for s in symbols):
+                out[f"🔴 Overbought {tf}"] = []
+                out[f"🟢 Oversold {tf}"] = []
+        for tf, side, s in self.signals(data, symbols):
+            key = f"🔴 Overbought {tf}" if side == "overbought" else f"🟢 Oversold {tf}"
+            out[key].append(base_name(s))
+        return out
+
+# ================= EMA TOUCH + HTF BIAS =================
+class EmaTouchDetector(Detector):
+    # dipakai juga oleh signalmonitor.py (dengan HTF) & pencaricoin.py
+    # (htf=(), tanpa slope), jadi /scan di bot mana pun memberi hasil
+    # yang sama untuk candle yang sama
+    name = "ema"
+
+    def __init__(self, tf="5m", htf=("15m", "1h"), limit=300,
+                 spans=(150, 200, 250), tol_pct=0.001, min_range=0.003,
+                 min_body=0.0015, min_slope=0.0002, min_gap=None,
+                 bias_span=200, top_n=200, name=None):
+        self.name = name or self.name
+        self.title = f"EMA TOUCH {tf}" + (f" | HTF {' + '.join(htf)}" if htf else "")
+        self.tf = tf
+        self.htf = tuple(htf)
+        self.streams = ((tf, limit, None),) + tuple((t, limit, tf) for t in self.htf)
+        self.limit = limit
+        self.spans = spans
+        self.filters = (tol_pct, min_range, min_body)
+        self.min_slope = min_slope
+        self.min_gap = min_gap
+        self.bias_span = bias_span
+        self.top_n = top_n
+        # (symbol, htf) -> (open time candle closed, +1 / -1 / 0). bias
+        # cuma berubah saat candle htf close, timestamp lama = expired
+        self.bias_memo = {}
+
+    def make_prefilter(self, candles=None, tickers=None):
+        # symbol yang pasti tidak touch / range terlalu kecil tidak di-fetch
+        tol_pct, min_range, _ = self.filters
+        return EmaTouchPrefilter(
+            self.name, self.tf, self.limit, self.spans, tol_pct, min_range,
+            candles=candles, tickers=tickers
+        )
+
+    def cached_bias(self, symbol, tf):
+        hit = self.bias_memo.get((symbol, tf))
+        if hit and hit[0] == last_closed_open(tf):
+            return hit[1]
+        return None
+
+    def tf_bias(self, data, tf, symbols):
+        # +1 / -1 / 0: close candle closed terakhir vs EMA bias. EMA cuma
+        # dihitung untuk symbol yang belum ada di memo candle ini
+        closed = last_closed_open(tf)
+        sides = np.zeros(len(symbols))
+        todo = []
+        for i, s in enumerate(symbols):
+            side = self.cached_bias(s, tf)
+            if side is None:
+                todo.append(i)
+            else:
+                sides[i] = side
+        if not todo:
+            return sides
+
+        m = kernels.to_matrix([data[tf].get(symbols[i]) or () for i in todo], self.limit)
+        e = kernels.ema(m["close"], self.bias_span)[:, -2]
+        fresh = np.nan_to_num(np.sign(m["close"][:, -2] - e))
+        for i, side, ts in zip(todo, fresh, m["time"][:, -2]):
+            sides[i] = side
+            # series belum memuat candle closed terakhir -> jangan di-memo
+            if ts == closed:
+                self.bias_memo[(symbols[i], tf)] = (closed, side)
+        return sides
+
+    def bias(self, data, symbols):
+        # +1 / -1 kalau searah di semua HTF, selain itu 0
+        sides = np.array([self.tf_bias(data, tf, symbols) for tf in self.htf])
+        return np.where(np.all(sides == sides[0], axis=0), sides[0], 0)
+
+    def evaluate(self, data, symbols, stats=None, rejects=None):
+        # -> [(symbol, trend +1 / -1, [span yang disentuh]), ...] untuk
+        # symbol yang lolos filter. stats (dict counter) ikut diupdate,
+        # rejects (list) diisi (symbol, filter pertama yang gagal)
+        # HTF boleh tidak di-fetch kalau bias-nya sudah ada di memo
+        got = [
+            s for s in symbols
+            if data[self.tf].get(s) and len(data[self.tf][s]) >= self.spans[-1] + 5
+            and all(
+                data[tf].get(s) or self.cached_bias(s, tf) is not None
+                for tf in self.htf
+            )
+        ]
+        if not got:
+            return []
+
+        m = kernels.to_matrix([data[self.tf][s] for s in got], self.limit)
+        scan = kernels.ema_touch_scan(
+            m, self.spans, *self.filters, min_gap=self.min_gap,
+            min_slope=self.min_slope, slope_span=self.spans[1]
+        )
+
+        trend = np.where(scan["bullish"], 1, -1)
+        checks = [("range", scan["range_ok"]), ("body", scan["body_ok"])]
+        if self.min_gap is not None:
+            checks.append(("gap", scan["gap_ok"]))
+        if self.min_slope is not None:
+            checks.append(("slope", scan["slope_ok"]))
+        if self.htf:
+            # no countertrend: trend tf harus searah bias HTF
+            checks.append(("htf", self.bias(data, got) == trend))
+
+        ok = np.logical_and.reduce([passed for _, passed in checks])
+        if rejects is not None:
+            for i in np.flatnonzero(~ok):
+                rejects.append((got[i], next(r for r, passed in checks if not passed[i])))
+
+        hits = [
+            (got[i], int(trend[i]), [span for span in self.spans if scan["touch"][span][i]])
+            for i in np.flatnonzero(ok)
+        ]
+
+        if stats is not None:
+            stats["filtered"] += len(got) - len(hits)
+            stats["scanned"] += len(hits)
+            for _, side, spans in hits:
+                stats["bullish" if side > 0 else "bearish"] += 1
+                for span in spans:
+                    stats[f"ema{span}"] += 1
+        return hits
+
+    def detect(self, data, symbols, stats=None):
+        out = {f"EMA{span}": [] for span in self.spans}
+        for sym, side, spans in self.evaluate(data, symbols, stats):
+            label = "Bullish 📈" if side > 0 else "Bearish 📉"
+            for span in spans:
+                out[f"EMA{span}"].append(f"{base_name(sym)} ({label})")
+        return out
+
+class StrictEmaTouchDetector(EmaTouchDetector):
+    # mode strict pencaricoin: candle lebih besar + EMA fast/slow
+    # renggang, tanpa HTF bias & slope
+    name = "ema_strict"
+
+    def __init__(self, tf="5m", limit=300, spans=(150, 200, 250), tol_pct=0.001,
+                 min_range=0.006, min_body=0.003, min_gap=0.002, top_n=200, name=None):
+        super().__init__(
+            tf, (), limit, spans, tol_pct, min_range, min_body,
+            min_slope=None, min_gap=min_gap, top_n=top_n, name=name
+        )
+        self.title = f"EMA TOUCH {tf} STRICT"
+
+# ================= EMA RIBBON =================
+class RibbonDetector(Detector):
+    name = "ribbon"
+
+    def __init__(self, tf="15m", limit=200, spans=(9, 26, 50, 200), top_n=200):
+        self.title = f"EMA RIBBON {tf} ({'/'.join(map(str, spans))})"
+        self.tf = tf
+        self.streams = ((tf, limit, None),)
+        self.limit = limit
+        self.spans = spans
+        self.top_n = top_n
+
+    def detect(self, data, symbols, stats=None):
+        got = [s for s in symbols if s in data[self.tf]]
+        if not got:
+            return {"BUY": [], "SELL": []}
+
+        # rumus signals.check_signal (ewm adjust=True), tapi on-demand
+        # jadi pakai candle forming
+        m = kernels.to_matrix([data[self.tf][s] for s in got], self.limit)
+        emas = kernels.ema_ribbon(m["close"], self.spans, adjust=True)
+        e = np.array([emas[span][:, -1] for span in self.spans])
+
+        buy = np.all(e[:-1] > e[1:], axis=0)
+        sell = np.all(e[:-1] < e[1:], axis=0)
+        return {
+            "BUY": [base_name(s) for s, hit in zip(got, buy) if hit],
+            "SELL": [base_name(s) for s, hit in zip(got, sell) if hit],
+        }
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from candles import current_open
+
+log = logging.getLogger("STREAMING")
+
+# ================= CONFIG =================
+LIVE_EDIT_INTERVAL = 3   # detik antar edit pesan live (limit edit Telegram)
+LIVE_MAX_CHARS = 4000    # pesan Telegram max 4096 char
+WAVE_LINGER = 0.5        # tunggu hasil lain sebelum hitung indikator
+SCAN_WINDOW = 8          # symbol yang di-fetch bersamaan (x2 TF native ~ MAX_CONCURRENCY)
+
+# ================= COMPLETION STREAM =================
+async def iter_completed(coros, linger=0, window=None):
+    # yield list hasil coroutine per gelombang yang selesai, jadi caller
+    # tetap bisa hitung indikator vectorized per batch kecil. linger >
+    # 0: setelah ada yang selesai, tunggu sebentar supaya gelombang tidak
+    # cuma satu hasil. window: maksimal coroutine yang jalan bersamaan,
+    # supaya request symbol awal tidak antri di belakang semua symbol.
+    # generator ditutup / task caller dibatalkan -> sisa task ikut
+    # dibatalkan dan slot fetcher langsung lepas
+    coros = iter(coros)
+    pending = set()
+
+    def fill():
+        for c in coros:
+            pending.add(asyncio.ensure_future(c))
+            if window and len(pending) >= window:
+                break
+
+    try:
+        fill()
+        while pending:
+            done, rest = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if linger and rest:
+                more, rest = await asyncio.wait(rest, timeout=linger)
+                done |= more
+            pending.clear()
+            pending.update(rest)
+            fill()
+            yield [t.result() for t in done]
+    finally:
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for c in coros:
+            c.close()
+
+# ================= LIVE MESSAGE =================
+class LiveMessage:
+    # satu pesan yang di-edit selama scan berjalan. update() tidak
+    # blocking: edit digabung, paling sering sekali per interval, yang
+    # terkirim selalu teks terbaru
+    def __init__(self, message, interval=LIVE_EDIT_INTERVAL, **kwargs):
+        self.message = message
+        self.interval = interval
+        self.kwargs = kwargs
+        self.text = None
+        self.shown = None
+        self.last = 0.0
+        self.hold = 0.0     # RetryAfter: jangan edit sebelum ini
+        self.task = None
+
+    def update(self, text):
+        self.text = text[:LIVE_MAX_CHARS]
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self, throttle=True):
+        while self.text != self.shown:
+            ready = max(self.last + self.interval, self.hold) if throttle else self.hold
+            wait = ready - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self._edit(self.text)
+
+    async def _edit(self, text):
+        try:
+            await self.message.edit_text(text, **self.kwargs)
+        except RetryAfter as e:
+            # teks tidak ditandai terkirim, dicoba lagi setelah jeda
+            wait = e.retry_after
+            wait = wait.total_seconds() if hasattr(wait, "total_seconds") else wait
+            self.hold = time.monotonic() + wait
+            return
+        except BadRequest as e:
+            # "message is not modified" / markdown rusak: lewati
+            log.debug(f"Edit dilewati: {e}")
+        except TelegramError as e:
+            log.warning(f"Edit gagal: {e}")
+        self.shown = text
+        self.last = time.monotonic()
+
+    async def finish(self, text):
+        # teks final dikirim tanpa throttle interval, edit yang masih
+        # antri dibatalkan
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        self.text = text[:LIVE_MAX_CHARS]
+        await self._flush(throttle=False)
+
+# ================= SCAN JOBS =================
+class ScanJob:
+    # satu scan yang jalan, dibagi ke semua chat yang minta scan sama.
+    # scan publish() teks progress, semua pesan live ikut di-edit
+    def __init__(self, key):
+        self.key = key
+        self.live = {}      # chat_id -> LiveMessage
+        self.text = None
+        self.final = None   # teks akhir (hasil / batal / gagal)
+        self.task = None
+
+    def attach(self, chat_id, live):
+        # job bisa selesai selagi reply intro dikirim -> langsung teks akhir
+        if self.final is not None:
+            asyncio.ensure_future(live.finish(self.final))
+            return
+        self.live[chat_id] = live
+        if self.text:
+            live.update(self.text)
+
+    def publish(self, text):
+        self.text = text
+        for live in self.live.values():
+            live.update(text)
+
+    def status(self, note):
+        return f"{self.text}\n\n{note}" if self.text else note
+
+    async def finish(self, text):
+        self.final = text
+        await asyncio.gather(*(live.finish(text) for live in list(self.live.values())))
+
+class ScanJobs:
+    # single-flight per (strategy, mode, candle window): request kedua
+    # ikut job yang sedang jalan, hasil selesai di-cache sampai candle
+    # tf berikutnya close. scan jalan sebagai task terpisah dari handler,
+    # jadi /cancel tetap diproses walau update Telegram diproses berurutan
+    def __init__(self):
+        self.jobs = {}
+        self.results = {}
+
+    def key(self, strategy, mode, tf):
+        return strategy, mode, tf, current_open(tf)
+
+    def running(self):
+        return [job for job in self.jobs.values() if not job.task.done()]
+
+    async def submit(self, update, context, key, run, intro, **kwargs):
+        # run(job) -> teks hasil akhir
+        cached = self.results.get(key)
+        if cached is not None:
+            await update.message.reply_text(
+                (cached + "\n♻️ Hasil cache candle ini")[:LIVE_MAX_CHARS], **kwargs
+            )
+            return
+
+        job = self.jobs.get(key)
+        if job is None or job.task.done():
+            job = self.jobs[key] = ScanJob(key)
+            job.task = context.application.create_task(self._run(job, run))
+        else:
+            intro = "🔗 Scan yang sama sedang berjalan, hasil dikirim ke sini juga\n\n" + intro
+
+        message = await update.message.reply_text(intro, **kwargs)
+        job.attach(update.effective_chat.id, LiveMessage(message, **kwargs))
+
+    async def _run(self, job, run):
+        try:
+            text = await run(job)
+            # hasil candle yang sudah lewat tidak disimpan lagi
+            self.results = {
+                k: v for k, v in self.results.items() if k[3] == current_open(k[2])
+            }
+            if job.key[3] == current_open(job.key[2]):
+                self.results[job.key] = text
+            await job.finish(text)
+        except asyncio.CancelledError:
+            await job.finish(job.status("🛑 Scan dibatalkan"))
+            raise
+        except Exception:
+            log.exception(f"Scan {job.key[:3]} gagal")
+            await job.finish(job.status("❌ Scan gagal, coba lagi nanti"))
+        finally:
+            self._forget(job)
+
+    def _forget(self, job):
+        # jangan buang job baru dengan key yang sama
+        if self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+
+    async def cancel(self, chat_id):
+        # lepas chat dari job; job tanpa peminat lagi dibatalkan dan
+        # slot fetcher langsung lepas. -> jumlah job yang diikuti
+        found = 0
+        for job in self.running():
+            live = job.live.pop(chat_id, None)
+            if live is None:
+                continue
+            found += 1
+            if job.live:
+                await live.finish(job.status("🛑 Berhenti mengikuti scan"))
+            else:
+                # task yang belum sempat jalan tidak lewat except di _run
+                job.live[chat_id] = live
+                job.task.cancel()
+                self._forget(job)
+                await asyncio.gather(job.task, return_exceptions=True)
+                if job.final is None:
+                    await job.finish(job.status("🛑 Scan dibatalkan"))
+        return found
+
+_JOBS = None
+
+def get_scan_jobs():
+    global _JOBS
+    if _JOBS is None:
+        _JOBS = ScanJobs()
+    return _JOBS
+
+async def cancel_scan(update, context):
+    if not await get_scan_jobs().cancel(update.effective_chat.id):
+        await update.message.reply_text("ℹ️ Tidak ada scan yang berjalan")
+        return
+
+    await update.message.reply_text("🛑 Scan dibatalkan")
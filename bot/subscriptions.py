@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+
+log = logging.getLogger("SUBSCRIPTIONS")
+
+# ================= CONFIG =================
+SUBSCRIPTIONS_FILE = os.getenv(
+    "SUBSCRIPTIONS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "subscriptions.json")
+)
+
+# ================= INDEX =================
+class SubscriptionIndex:
+    # dua arah: symbol -> chat, chat -> symbol. monitor cukup iterasi
+    # symbol (sekali fetch & evaluasi), hasil di-fan-out ke chat-nya.
+    # chat id disimpan sebagai str (sama untuk id angka & @channel)
+    def __init__(self, path=SUBSCRIPTIONS_FILE):
+        self.path = path
+        self.by_symbol = {}
+        self.by_chat = {}
+        self.loaded = False
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        self.by_symbol.clear()
+        self.by_chat.clear()
+        for chat, symbols in data.get("chats", {}).items():
+            for symbol in symbols:
+                self._add(chat, symbol)
+        self.loaded = True
+        log.info(f"{len(self.by_chat)} chat, {len(self.by_symbol)} symbol dari {self.path}")
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"chats": {c: sorted(s) for c, s in self.by_chat.items()}}, f)
+        os.replace(tmp, self.path)
+
+    def _add(self, chat, symbol):
+        symbols = self.by_chat.setdefault(chat, set())
+        if symbol in symbols:
+            return False
+        symbols.add(symbol)
+        self.by_symbol.setdefault(symbol, set()).add(chat)
+        return True
+
+    def subscribe(self, chat, symbol, save=True):
+        added = self._add(str(chat), symbol)
+        if added and save:
+            self.save()
+        return added
+
+    def unsubscribe(self, chat, symbol, save=True):
+        chat = str(chat)
+        symbols = self.by_chat.get(chat)
+        if not symbols or symbol not in symbols:
+            return False
+
+        symbols.discard(symbol)
+        if not symbols:
+            del self.by_chat[chat]
+        chats = self.by_symbol[symbol]
+        chats.discard(chat)
+        if not chats:
+            del self.by_symbol[symbol]
+
+        if save:
+            self.save()
+        return True
+
+    def symbols(self, chat=None):
+        # chat None -> semua symbol yang punya subscriber
+        if chat is None:
+            return list(self.by_symbol)
+        return sorted(self.by_chat.get(str(chat), ()))
+
+    def chats(self, symbol):
+        return self.by_symbol.get(symbol, set())
+
+_SUBSCRIPTIONS = None
+
+def get_subscriptions():
+    global _SUBSCRIPTIONS
+    if _SUBSCRIPTIONS is None:
+        _SUBSCRIPTIONS = SubscriptionIndex()
+        _SUBSCRIPTIONS.load()
+    return _SUBSCRIPTIONS
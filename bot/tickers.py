@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+
+from fetcher import get_fetcher
+
+log = logging.getLogger("TICKERS")
+
+# ================= CONFIG =================
+TICKER_TTL = 10  # seconds
+
+def is_usdt_perp(symbol):
+    return symbol.endswith("/USDT:USDT")
+
+# ================= SNAPSHOT =================
+class TickerSnapshot:
+    # satu fetch_tickers dipakai bersama semua scanner; caller yang datang
+    # saat fetch masih jalan ikut menunggu request yang sama (single-flight)
+    def __init__(self, fetcher=None, ttl=TICKER_TTL):
+        self.fetcher = fetcher or get_fetcher()
+        self.ttl = ttl
+        self.tickers = {}
+        self.updated = 0.0
+        self.inflight = None
+
+        self.usdt = {}        # USDT perp saja
+        self.by_volume = []   # symbol USDT perp, quoteVolume desc
+        self.by_change = []   # symbol USDT perp dengan percentage, |%| desc
+
+    def fresh(self):
+        return bool(self.tickers) and time.monotonic() - self.updated < self.ttl
+
+    async def refresh(self, force=False):
+        if not force and self.fresh():
+            return self
+
+        if self.inflight is None:
+            self.inflight = asyncio.ensure_future(self._load())
+
+        # shield: caller yang di-cancel tidak membatalkan fetch bersama
+        await asyncio.shield(self.inflight)
+        return self
+
+    async def _load(self):
+        try:
+            tickers = await self.fetcher.fetch_tickers()
+            self._build(tickers)
+        finally:
+            self.inflight = None
+
+    def _build(self, tickers):
+        usdt = {s: t for s, t in tickers.items() if t and is_usdt_perp(s)}
+
+        self.tickers = tickers
+        self.usdt = usdt
+        self.by_volume = sorted(
+            (s for s, t in usdt.items() if t.get("quoteVolume")),
+            key=lambda s: usdt[s]["quoteVolume"],
+            reverse=True
+        )
+        self.by_change = sorted(
+            (s for s, t in usdt.items() if t.get("percentage") is not None),
+            key=lambda s: abs(usdt[s]["percentage"]),
+            reverse=True
+        )
+        self.updated = time.monotonic()
+        log.info(f"Snapshot {len(tickers)} tickers ({len(usdt)} USDT perp)")
+
+    # ================= VIEWS =================
+    def top_volume(self, n):
+        return self.by_volume[:n]
+
+    def movers(self, min_pct, pool=30, n=10):
+        # |%| >= min_pct, ambil `pool` volume terbesar, urut % turun
+        picked = []
+        for s in self.by_change:
+            t = self.usdt[s]
+            if abs(t["percentage"]) < min_pct:
+                break
+            picked.append({
+                "symbol": s,
+                "change": t["percentage"],
+                "volume": t.get("quoteVolume") or 0
+            })
+
+        picked.sort(key=lambda r: r["volume"], reverse=True)
+        picked = picked[:pool]
+        picked.sort(key=lambda r: r["change"], reverse=True)
+        return picked[:n]
+
+_SNAPSHOT = None
+
+def get_ticker_snapshot():
+    global _SNAPSHOT
+    if _SNAPSHOT is None:
+        _SNAPSHOT = TickerSnapshot()
+    return _SNAPSHOT
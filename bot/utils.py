@@ -1,12 +1,58 @@
-import pandas as pd
+import numpy as np
 
-def calc_support_resistance(df, window=20):
-    supports, resistances = [], []
+# ================= ROLLING EXTREME =================
+def sliding_extreme(a, width, op):
+    # van Herk / Gil-Werman: min/max semua window [j, j+width) dalam O(n).
+    # op = np.fmin / np.fmax (NaN dilewati seperti pandas .min()/.max())
+    n = len(a)
+    if n < width:
+        return np.empty(0)
 
-    for i in range(window, len(df) - window):
-        if df.low.iloc[i] == df.low.iloc[i-window:i+window].min():
-            supports.append(float(df.low.iloc[i]))
-        if df.high.iloc[i] == df.high.iloc[i-window:i+window].max():
-            resistances.append(float(df.high.iloc[i]))
+    pad = (-n) % width
+    blocks = np.concatenate([a, np.full(pad, np.nan)]).reshape(-1, width)
+    prefix = op.accumulate(blocks, axis=1).ravel()
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return op(suffix[:n - width + 1], prefix[width - 1:n])
 
-    return supports[-2:], resistances[-2:]
+def pivot_index(values, window, op):
+    # index i (window <= i < n - window) dimana values[i] adalah
+    # extreme dari values[i-window : i+window]
+    n = len(values)
+    if n <= 2 * window:
+        return np.empty(0, dtype=np.int64)
+
+    ext = sliding_extreme(values, 2 * window, op)[:n - 2 * window]
+    idx = np.arange(window, n - window)
+    return idx[values[idx] == ext]
+
+def cluster_levels(levels, pct):
+    # level yang jaraknya <= pct digabung, yang paling baru dipakai
+    out = []
+    for lv in levels:
+        out = [x for x in out if abs(x - lv) > abs(lv) * pct]
+        out.append(lv)
+    return out
+
+# ================= SUPPORT / RESISTANCE =================
+def calc_support_resistance(df, window=20, count=2, cluster_pct=None):
+    # window boleh int atau list, pivot dari semua window digabung
+    windows = [window] if np.isscalar(window) else list(window)
+    # df: CandleSeries atau DataFrame (kolom low / high)
+    low = np.asarray(df.low, dtype=np.float64)
+    high = np.asarray(df.high, dtype=np.float64)
+
+    sup_idx = np.unique(np.concatenate(
+        [pivot_index(low, w, np.fmin) for w in windows]
+    )).astype(np.int64)
+    res_idx = np.unique(np.concatenate(
+        [pivot_index(high, w, np.fmax) for w in windows]
+    )).astype(np.int64)
+
+    supports = [float(x) for x in low[sup_idx]]
+    resistances = [float(x) for x in high[res_idx]]
+
+    if cluster_pct:
+        supports = cluster_levels(supports, cluster_pct)
+        resistances = cluster_levels(resistances, cluster_pct)
+
+    return supports[-count:], resistances[-count:]
@@ -3,10 +3,8 @@
 # FINAL CLEAR OUTPUT VERSION
 # =================================================
 
-import ccxt
-import pandas as pd
-import asyncio
 import os
+import sys
 import logging
 import time
 
@@ -42,140 +40,110 @@ STRICT_RANGE_PCT = 0.006
 STRICT_BODY_PCT = 0.003
 STRICT_EMA_GAP = 0.002
 
-TOP_N = 200
-BATCH_SIZE = 50
-TOTAL_BATCH = 4
+# log [FILTER] per filter detector yang gagal
+FILTER_REASONS = {"range": "candle lemah", "body": "candle lemah"}
+STRICT_REASONS = {
+    "range": "range kecil (STRICT)",
+    "body": "body kecil (STRICT)",
+    "gap": "EMA tidak sejajar",
+}
 
-DELAY_PER_SYMBOL = 0.5
-DELAY_BETWEEN_BATCH = 10
+TOP_N = 200
 
 # ================= EXCHANGE =================
-exchange = ccxt.mexc({
-    "enableRateLimit": True,
-    "options": {"defaultType": "swap"}
-})
-
-MARKETS_LOADED = False
-
-# ================= INIT MARKET =================
-async def ensure_markets():
-    global MARKETS_LOADED
-    if not MARKETS_LOADED:
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, exchange.load_markets)
-        MARKETS_LOADED = True
-        log.info("[INIT] Markets loaded")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot"))
+from exchange import ensure_markets
+from candles import get_candle_cache
+from tickers import get_ticker_snapshot
+from strategies import EmaTouchDetector, StrictEmaTouchDetector
+from streaming import SCAN_WINDOW, WAVE_LINGER, cancel_scan, get_scan_jobs, iter_completed
+import metrics
+
+candles = get_candle_cache()
+tickers = get_ticker_snapshot()
+scan_jobs = get_scan_jobs()
+
+EMA_SPANS = (EMA_FAST, EMA_SLOW, EMA_EXTRA)
+
+# filter sama dengan detector bot utama (ema_strict = mode strict),
+# normal: tanpa HTF bias & slope
+detector = EmaTouchDetector(
+    TF, (), FETCH_LIMIT, EMA_SPANS, TOLERANCE_PCT, MIN_RANGE_PCT, MIN_BODY_PCT,
+    min_slope=None, top_n=TOP_N, name="pencaricoin"
+)
+detector_strict = StrictEmaTouchDetector(
+    TF, FETCH_LIMIT, EMA_SPANS, TOLERANCE_PCT, STRICT_RANGE_PCT, STRICT_BODY_PCT,
+    STRICT_EMA_GAP, top_n=TOP_N, name="pencaricoin_strict"
+)
+
+# symbol yang pasti tidak touch / range terlalu kecil tidak di-fetch
+prefilter = detector.make_prefilter(candles, tickers)
+prefilter_strict = detector_strict.make_prefilter(candles, tickers)
 
 # ================= SAFE FETCH =================
 async def safe_fetch(symbol):
-    loop = asyncio.get_running_loop()
-    for i in range(3):
-        try:
-            return await loop.run_in_executor(
-                None,
-                lambda: exchange.fetch_ohlcv(symbol, TF, limit=FETCH_LIMIT)
-            )
-        except Exception as e:
-            log.warning(f"[FETCH RETRY {i+1}] {symbol} | {e}")
-            await asyncio.sleep(2)
-    log.error(f"[FETCH FAILED] {symbol}")
-    return None
-
-# ================= EMA =================
-def calc_ema(df):
-    df["ema150"] = df["close"].ewm(span=EMA_FAST, adjust=False).mean()
-    df["ema200"] = df["close"].ewm(span=EMA_SLOW, adjust=False).mean()
-    df["ema250"] = df["close"].ewm(span=EMA_EXTRA, adjust=False).mean()
-    return df
+    # retry sudah ditangani fetcher, cache cuma ambil bar baru
+    try:
+        return await candles.series(symbol, TF, FETCH_LIMIT)
+    except Exception as e:
+        log.error(f"[FETCH FAILED] {symbol} | {e}")
+        return None
 
 # ================= TOP VOLUME =================
-def get_top_volume_symbols(n):
-    tickers = exchange.fetch_tickers()
-    symbols = []
-    for s, t in tickers.items():
-        if s.endswith("/USDT:USDT") and t and t.get("quoteVolume"):
-            symbols.append((s, t["quoteVolume"]))
-    symbols.sort(key=lambda x: x[1], reverse=True)
-    return [s for s, _ in symbols[:n]]
+async def get_top_volume_symbols(n):
+    await tickers.refresh()
+    return tickers.top_volume(n)
 
 # ================= SCAN CORE =================
-async def scan_batch(symbols, batch_no, stats, strict=False):
-    results = {"ema150": [], "ema200": [], "ema250": []}
-
-    for idx, sym in enumerate(symbols, 1):
-        base = sym.split("/")[0]
-        log.info(f"[SCAN] Batch {batch_no}/{TOTAL_BATCH} | {base} ({idx}/{len(symbols)})")
-
-        ohlcv = await safe_fetch(sym)
-        if not ohlcv:
-            continue
+async def fetch_symbol(sym):
+    return sym, await safe_fetch(sym)
+
+async def scan_symbols(symbols, stats, strict=False):
+    # async generator: symbol di-fetch bersamaan (pacing oleh adaptive
+    # limiter), tiap gelombang yang selesai langsung dihitung.
+    # yield (jumlah symbol, [(ema key, "BASE (trend)"), ...])
+    async for done in iter_completed((fetch_symbol(sym) for sym in symbols), WAVE_LINGER, SCAN_WINDOW):
+        for sym, ohlcv in done:
+            if ohlcv and len(ohlcv) < EMA_EXTRA + 5:
+                log.info(f"[SKIP] {sym.split('/')[0]} | data kurang")
+
+        # EMA ribbon + filter dihitung sekali untuk seluruh gelombang
+        data = {TF: {sym: ohlcv for sym, ohlcv in done}}
+        rejects = []
+        with metrics.timed("indicator", TF):
+            passed = (detector_strict if strict else detector).evaluate(
+                data, [sym for sym, _ in done], stats, rejects
+            )
 
-        df = pd.DataFrame(
-            ohlcv,
-            columns=["time","open","high","low","close","volume"]
-        )
-        df["time"] = pd.to_datetime(df["time"], unit="ms", utc=True)
-        df.set_index("time", inplace=True)
-
-        if len(df) < EMA_EXTRA + 5:
-            log.info(f"[SKIP] {base} | data kurang")
-            continue
-
-        df = calc_ema(df)
-        c = df.iloc[-2]
-
-        range_pct = (c.high - c.low) / c.close
-        body_pct = abs(c.close - c.open) / c.close
-        ema_gap = abs(c.ema150 - c.ema200) / c.close
-
-        # ===== FILTER =====
-        if strict:
-            if range_pct < STRICT_RANGE_PCT:
-                stats["filtered"] += 1
-                log.info(f"[FILTER] {base} | range kecil (STRICT)")
-                continue
-            if body_pct < STRICT_BODY_PCT:
-                stats["filtered"] += 1
-                log.info(f"[FILTER] {base} | body kecil (STRICT)")
-                continue
-            if ema_gap < STRICT_EMA_GAP:
-                stats["filtered"] += 1
-                log.info(f"[FILTER] {base} | EMA tidak sejajar")
-                continue
-        else:
-            if range_pct < MIN_RANGE_PCT or body_pct < MIN_BODY_PCT:
-                stats["filtered"] += 1
-                log.info(f"[FILTER] {base} | candle lemah")
-                continue
-
-        stats["scanned"] += 1
-
-        trend = "Bullish 📈" if c.ema150 > c.ema200 else "Bearish 📉"
-        stats["bullish" if "Bullish" in trend else "bearish"] += 1
-
-        tol = c.close * TOLERANCE_PCT
-        touched = False
-
-        if c.low - tol <= c.ema150 <= c.high + tol:
-            results["ema150"].append(f"{base} ({trend})")
-            stats["ema150"] += 1
-            touched = True
-
-        if c.low - tol <= c.ema200 <= c.high + tol:
-            results["ema200"].append(f"{base} ({trend})")
-            stats["ema200"] += 1
-            touched = True
-
-        if c.low - tol <= c.ema250 <= c.high + tol:
-            results["ema250"].append(f"{base} ({trend})")
-            stats["ema250"] += 1
-            touched = True
-
-        log.info(f"[RESULT] {base} | {trend} | {'TOUCH' if touched else 'NO TOUCH'}")
-
-        await asyncio.sleep(DELAY_PER_SYMBOL)
-
-    return results
+        reasons = STRICT_REASONS if strict else FILTER_REASONS
+        for sym, reason in rejects:
+            log.info(f"[FILTER] {sym.split('/')[0]} | {reasons[reason]}")
+
+        hits = []
+        for sym, side, spans in passed:
+            base = sym.split("/")[0]
+            trend = "Bullish 📈" if side > 0 else "Bearish 📉"
+            for span in spans:
+                hits.append((f"ema{span}", f"{base} ({trend})"))
+            log.info(f"[RESULT] {base} | {trend} | {'TOUCH' if spans else 'NO TOUCH'}")
+
+        yield len(done), hits
+
+def format_results(all_results):
+    return (
+        "━━━━━━━━━━━━━━\n"
+        "📈 *EMA150*\n"
+        "━━━━━━━━━━━━━━\n"
+        + ("\n".join(sorted(set(all_results["ema150"]))) or "- None") +
+        "\n\n━━━━━━━━━━━━━━\n"
+        "📉 *EMA200*\n"
+        "━━━━━━━━━━━━━━\n"
+        + ("\n".join(sorted(set(all_results["ema200"]))) or "- None") +
+        "\n\n━━━━━━━━━━━━━━\n"
+        "🟣 *EMA250*\n"
+        "━━━━━━━━━━━━━━\n"
+        + ("\n".join(sorted(set(all_results["ema250"]))) or "- None")
+    )
 
 # ================= COMMANDS =================
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -184,40 +152,26 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Commands:\n"
         "• /scan → Normal mode\n"
         "• /scan_strict → Strict only\n"
-        "• /status → Bot status",
+        "• /cancel → Batalkan scan\n"
+        "• /status → Bot status\n"
+        "• /stats → Statistik performa",
         parse_mode="Markdown"
     )
 
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if context.application.bot_data.get("scanning"):
+    if scan_jobs.running():
         await update.message.reply_text("⏳ Scan sedang berjalan")
     else:
         await update.message.reply_text("✅ Bot standby")
 
 # ================= RUN SCAN =================
-async def run_scan(update, context, strict=False):
-    if context.application.bot_data.get("scanning"):
-        await update.message.reply_text(
-            "⛔ Scan masih berjalan\nMohon tunggu sampai selesai ⏳"
-        )
-        return
-
-    context.application.bot_data["scanning"] = True
+async def run_scan(job, strict=False):
+    # hasil dipublish ke semua chat yang ikut job, return teks akhir
     await ensure_markets()
 
     mode = "STRICT ONLY" if strict else "NORMAL"
     start_time = time.time()
 
-    await update.message.reply_text(
-        f"🔍 *SCAN DIMULAI*\n\n"
-        f"Mode : {mode}\n"
-        f"TF   : {TF}\n"
-        f"Pair : TOP {TOP_N}\n"
-        f"Estimasi : ±8–12 menit\n\n"
-        "⏳ Bot sedang bekerja...",
-        parse_mode="Markdown"
-    )
-
     log.info(f"[SCAN START] Mode={mode}")
 
     stats = {
@@ -228,85 +182,92 @@ async def run_scan(update, context, strict=False):
         "ema250": 0,
         "bullish": 0,
         "bearish": 0,
+        "prefilter": 0,
     }
 
-    symbols = get_top_volume_symbols(TOP_N)
-    batches = [symbols[i:i+BATCH_SIZE] for i in range(0, TOP_N, BATCH_SIZE)]
+    symbols = await get_top_volume_symbols(TOP_N)
+    symbols, stats["prefilter"] = await (prefilter_strict if strict else prefilter).prune(symbols)
 
     all_results = {"ema150": [], "ema200": [], "ema250": []}
 
+    # hit langsung masuk ke pesan live, tidak menunggu semua symbol
+    done = 0
     try:
-        for i, batch in enumerate(batches, 1):
-            batch_result = await scan_batch(batch, i, stats, strict)
-
-            for k in all_results:
-                all_results[k] += batch_result[k]
-
-            await update.message.reply_text(
-                f"🔄 Progress Scan\nBatch {i}/{TOTAL_BATCH} selesai"
+        async for n, hits in scan_symbols(symbols, stats, strict):
+            done += n
+            for key, item in hits:
+                all_results[key].append(item)
+
+            job.publish(
+                f"🔍 *SCAN ({mode})*\n"
+                f"⏳ {done}/{len(symbols)} pair\n\n"
+                + format_results(all_results)
             )
+    finally:
+        log.info("[SCAN FINISHED]")
 
-            log.info(f"[BATCH DONE] {i}/{TOTAL_BATCH}")
-            await asyncio.sleep(DELAY_BETWEEN_BATCH)
-
-        elapsed = int(time.time() - start_time)
+    elapsed = int(time.time() - start_time)
 
-        if not any(all_results.values()):
-            await update.message.reply_text(
-                "🚫 *TIDAK ADA SIGNAL*\n\n"
-                f"Mode : {mode}\n"
-                "Market tidak memenuhi kriteria ketat.\n"
-                "Tidak entry = good risk management ✅",
-                parse_mode="Markdown"
-            )
-            return
-
-        msg = (
-            f"🔍 *HASIL SCAN ({mode})*\n\n"
-            "━━━━━━━━━━━━━━\n"
-            "📈 *EMA150*\n"
-            "━━━━━━━━━━━━━━\n"
-            + ("\n".join(sorted(set(all_results["ema150"]))) or "- None") +
-            "\n\n━━━━━━━━━━━━━━\n"
-            "📉 *EMA200*\n"
-            "━━━━━━━━━━━━━━\n"
-            + ("\n".join(sorted(set(all_results["ema200"]))) or "- None") +
-            "\n\n━━━━━━━━━━━━━━\n"
-            "🟣 *EMA250*\n"
-            "━━━━━━━━━━━━━━\n"
-            + ("\n".join(sorted(set(all_results["ema250"]))) or "- None") +
-            "\n\n━━━━━━━━━━━━━━\n"
-            "📊 *STAT*\n"
-            "━━━━━━━━━━━━━━\n"
-            f"Scanned  : {stats['scanned']}\n"
-            f"Filtered : {stats['filtered']}\n"
-            f"Bullish  : {stats['bullish']}\n"
-            f"Bearish  : {stats['bearish']}\n"
-            f"Time     : {elapsed//60}m {elapsed%60}s\n\n"
-            f"🕒 {datetime.now(timezone.utc):%Y-%m-%d %H:%M UTC}"
+    if not any(all_results.values()):
+        return (
+            "🚫 *TIDAK ADA SIGNAL*\n\n"
+            f"Mode : {mode}\n"
+            "Market tidak memenuhi kriteria ketat.\n"
+            "Tidak entry = good risk management ✅"
         )
 
-        await update.message.reply_text(msg, parse_mode="Markdown")
-
-    finally:
-        context.application.bot_data["scanning"] = False
-        log.info("[SCAN FINISHED]")
+    return (
+        f"🔍 *HASIL SCAN ({mode})*\n\n"
+        + format_results(all_results) +
+        "\n\n━━━━━━━━━━━━━━\n"
+        "📊 *STAT*\n"
+        "━━━━━━━━━━━━━━\n"
+        f"Scanned  : {stats['scanned']}\n"
+        f"Filtered : {stats['filtered']}\n"
+        f"Bullish  : {stats['bullish']}\n"
+        f"Bearish  : {stats['bearish']}\n"
+        f"Prefilter: {stats['prefilter']} skip\n"
+        f"Time     : {elapsed//60}m {elapsed%60}s\n\n"
+        f"🕒 {datetime.now(timezone.utc):%Y-%m-%d %H:%M UTC}"
+    )
 
 # ================= COMMAND BINDING =================
+async def start_run(update, context, strict=False):
+    # scan mode & candle sama -> ikut job yang jalan / hasil cache
+    mode = "STRICT ONLY" if strict else "NORMAL"
+    await scan_jobs.submit(
+        update, context, scan_jobs.key("pencaricoin", mode, TF),
+        lambda job: run_scan(job, strict),
+        f"🔍 *SCAN DIMULAI*\n\n"
+        f"Mode : {mode}\n"
+        f"TF   : {TF}\n"
+        f"Pair : TOP {TOP_N}\n\n"
+        "⏳ Bot sedang bekerja...",
+        parse_mode="Markdown"
+    )
+
 async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await run_scan(update, context, strict=False)
+    await start_run(update, context, strict=False)
 
 async def scan_strict(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await run_scan(update, context, strict=True)
+    await start_run(update, context, strict=True)
 
 # ================= MAIN =================
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(metrics.summary(), parse_mode="Markdown")
+
+async def post_shutdown(app):
+    await candles.fetcher.close()
+
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = ApplicationBuilder().token(BOT_TOKEN).post_shutdown(post_shutdown).build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("status", status))
+    app.add_handler(CommandHandler("stats", stats))
     app.add_handler(CommandHandler("scan", scan))
     app.add_handler(CommandHandler("scan_strict", scan_strict))
+    app.add_handler(CommandHandler("cancel", cancel_scan))
 
     log.info("EMA TOUCH SCANNER BOT RUNNING")
     app.run_polling(stop_signals=None)
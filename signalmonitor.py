@@ -1,7 +1,6 @@
-import ccxt
-import pandas as pd
 import asyncio
 import os
+import sys
 import logging
 
 from telegram import Update
@@ -39,171 +38,139 @@ MIN_EMA_SLOPE = 0.0002   # 0.02%
 
 TOP_N = 200
 BATCH_SIZE = 50
-TOTAL_BATCH = 4
 
-DELAY_BETWEEN_BATCH = 30
-DELAY_PER_SYMBOL = 1
+# 🔥 HTF WARM (candle HTF di-cache di background tiap candle 15m close)
+HTF_WARM = True
+HTF_WARM_DELAY = 10   # detik setelah candle close
 
 DEBUG = False  # 🔧 TRUE kalau mau lihat log detail
 
 # ================= EXCHANGE =================
-exchange = ccxt.mexc({
-    "enableRateLimit": True,
-    "options": {"defaultType": "swap"}
-})
-
-MARKETS_LOADED = False
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot"))
+from exchange import ensure_markets
+from candles import get_candle_cache
+from tickers import get_ticker_snapshot
+from scheduler import run_at_close
+from strategies import EmaTouchDetector
+from streaming import cancel_scan, get_scan_jobs
+import metrics
+
+candles = get_candle_cache()
+tickers = get_ticker_snapshot()
+scan_jobs = get_scan_jobs()
+
+EMA_SPANS = (EMA_FAST, EMA_SLOW, EMA_EXTRA)
+
+# filter & HTF bias sama dengan /scan ema di bot utama: bias dari EMA200
+# candle HTF yang sama, tidak bergantung state indikator proses ini
+detector = EmaTouchDetector(
+    TF_LTF, (TF_HTF_1, TF_HTF_2), FETCH_LIMIT, EMA_SPANS, TOLERANCE_PCT,
+    MIN_RANGE_PCT, MIN_BODY_PCT, min_slope=MIN_EMA_SLOPE, bias_span=EMA_SLOW,
+    top_n=TOP_N, name="signalmonitor"
+)
 
-async def ensure_markets():
-    global MARKETS_LOADED
-    if not MARKETS_LOADED:
-        await asyncio.get_running_loop().run_in_executor(
-            None, exchange.load_markets
-        )
-        MARKETS_LOADED = True
+# symbol yang pasti tidak touch / range terlalu kecil tidak di-fetch
+prefilter = detector.make_prefilter(candles, tickers)
 
 # ================= SAFE FETCH =================
-async def safe_fetch(symbol, tf):
-    loop = asyncio.get_running_loop()
-    for i in range(3):
-        try:
-            return await loop.run_in_executor(
-                None,
-                lambda: exchange.fetch_ohlcv(symbol, tf, limit=FETCH_LIMIT)
-            )
-        except Exception as e:
-            log.warning(f"Fetch {symbol} {tf} retry {i+1}: {e}")
-            await asyncio.sleep(2)
-    return None
-
-# ================= EMA =================
-def calc_ema(df):
-    df["ema150"] = df["close"].ewm(span=EMA_FAST, adjust=False).mean()
-    df["ema200"] = df["close"].ewm(span=EMA_SLOW, adjust=False).mean()
-    df["ema250"] = df["close"].ewm(span=EMA_EXTRA, adjust=False).mean()
-    return df
-
-# ================= TREND & SLOPE =================
-def ema_slope_ok(series):
-    slope = (series.iloc[-2] - series.iloc[-5]) / series.iloc[-5]
-    return abs(slope) >= MIN_EMA_SLOPE
-
-# ================= HTF BIAS =================
-async def get_htf_bias(symbol):
-    df15 = await safe_fetch(symbol, TF_HTF_1)
-    df1h = await safe_fetch(symbol, TF_HTF_2)
-
-    if not df15 or not df1h:
+async def safe_fetch(symbol, tf, base=None):
+    # retry sudah ditangani fetcher, cache cuma ambil bar baru.
+    # base: tf dibangun dari candle base yang sudah di-cache
+    try:
+        return await candles.series(symbol, tf, FETCH_LIMIT, base=base)
+    except Exception as e:
+        log.warning(f"Fetch {symbol} {tf} gagal: {e}")
         return None
 
-    df15 = pd.DataFrame(df15, columns=["t","o","h","l","c","v"])
-    df1h = pd.DataFrame(df1h, columns=["t","o","h","l","c","v"])
-
-    df15["ema200"] = df15["c"].ewm(span=200, adjust=False).mean()
-    df1h["ema200"] = df1h["c"].ewm(span=200, adjust=False).mean()
-
-    c15 = df15.iloc[-2]
-    c1h = df1h.iloc[-2]
-
-    if c15.c > c15.ema200 and c1h.c > c1h.ema200:
-        return "Bullish"
-    if c15.c < c15.ema200 and c1h.c < c1h.ema200:
-        return "Bearish"
-
-    return None
+# ================= HTF BIAS =================
+# bias per (symbol, tf) di-memo detector sampai candle tf berikutnya
+# close, jadi scan cuma fetch & hitung EMA200 HTF yang belum ada
+async def fetch_htf(symbol):
+    # 15m & 1h di-resample dari 5m (fetch native cuma untuk seed EMA200)
+    tfs = [tf for tf in detector.htf if detector.cached_bias(symbol, tf) is None]
+    rows = await asyncio.gather(*(safe_fetch(symbol, tf, base=TF_LTF) for tf in tfs))
+    return dict(zip(tfs, rows))
+
+async def warm_htf(symbol):
+    # 5m dulu supaya HTF bisa di-resample dari cache
+    if not await safe_fetch(symbol, TF_LTF):
+        return symbol, {}
+    return symbol, await fetch_htf(symbol)
+
+async def warm_htf_once():
+    symbols = await get_top_volume_symbols(TOP_N)
+    data = {tf: {} for tf in detector.htf}
+    for sym, htf in await asyncio.gather(*(warm_htf(s) for s in symbols)):
+        for tf, rows in htf.items():
+            if rows:
+                data[tf][sym] = rows
+
+    # isi memo bias untuk candle HTF yang baru close
+    with metrics.timed("indicator", TF_HTF_1):
+        for tf in detector.htf:
+            detector.tf_bias(data, tf, list(data[tf]))
+    log.info(f"HTF bias warm: {len(symbols)} symbols")
+
+async def htf_warm_loop(app):
+    # tiap close TF_HTF_1, dilewati kalau scan sedang jalan
+    await run_at_close(
+        "htf_warm", TF_HTF_1, warm_htf_once,
+        settle=HTF_WARM_DELAY, active=lambda: not scan_jobs.running()
+    )
 
 # ================= TOP VOLUME =================
-def get_top_volume_symbols(n):
-    tickers = exchange.fetch_tickers()
-    symbols = [
-        (s, t["quoteVolume"])
-        for s, t in tickers.items()
-        if s.endswith("/USDT:USDT") and t and t.get("quoteVolume")
-    ]
-    symbols.sort(key=lambda x: x[1], reverse=True)
-    return [s for s, _ in symbols[:n]]
+async def get_top_volume_symbols(n):
+    await tickers.refresh()
+    return tickers.top_volume(n)
 
 # ================= SCAN CORE =================
 async def scan_batch(symbols, batch_no, stats):
     ema150, ema200, ema250 = [], [], []
+    touched = {EMA_FAST: ema150, EMA_SLOW: ema200, EMA_EXTRA: ema250}
 
-    for idx, sym in enumerate(symbols, 1):
-        log.info(f"[Batch {batch_no}] {sym} ({idx}/{len(symbols)})")
-
-        htf_bias = await get_htf_bias(sym)
-        if not htf_bias:
-            stats["filtered"] += 1
-            continue
-
+    async def collect(sym):
+        # 5m dulu, HTF dibangun dari candle 5m ini
         ohlcv = await safe_fetch(sym, TF_LTF)
         if not ohlcv:
-            continue
-
-        df = pd.DataFrame(
-            ohlcv,
-            columns=["time","open","high","low","close","volume"]
-        )
-        df["time"] = pd.to_datetime(df["time"], unit="ms", utc=True)
-        df.set_index("time", inplace=True)
-
-        if len(df) < EMA_EXTRA + 5:
-            continue
-
-        df = calc_ema(df)
-        c = df.iloc[-2]
-        tol = c.close * TOLERANCE_PCT
-
-        # ACTIVE CANDLE FILTER
-        range_pct = (c.high - c.low) / c.close
-        body_pct = abs(c.close - c.open) / c.close
-
-        if range_pct < MIN_RANGE_PCT or body_pct < MIN_BODY_PCT:
-            stats["filtered"] += 1
-            continue
-
-        # EMA SLOPE FILTER
-        if not ema_slope_ok(df["ema200"]):
-            stats["filtered"] += 1
-            continue
-
-        trend = "Bullish 📈" if c.ema150 > c.ema200 else "Bearish 📉"
-
-        # 🚫 NO COUNTERTREND
-        if htf_bias not in trend:
-            stats["filtered"] += 1
-            continue
-
-        stats["scanned"] += 1
-        stats["bullish" if "Bullish" in trend else "bearish"] += 1
-
+            return sym, None, {}
+        return sym, ohlcv, await fetch_htf(sym)
+
+    # semua symbol batch jalan bersamaan, pacing oleh adaptive limiter
+    log.info(f"[Batch {batch_no}] {len(symbols)} symbols")
+    data = {tf: {} for tf in (TF_LTF,) + detector.htf}
+    for sym, ohlcv, htf in await asyncio.gather(*(collect(s) for s in symbols)):
+        data[TF_LTF][sym] = ohlcv
+        for tf, rows in htf.items():
+            data[tf][sym] = rows
+
+    # candle filter, slope, touch & HTF bias (no countertrend) untuk
+    # seluruh batch sekaligus
+    with metrics.timed("indicator", TF_LTF):
+        passed = detector.evaluate(data, symbols, stats)
+
+    for sym, side, spans in passed:
+        trend = "Bullish 📈" if side > 0 else "Bearish 📉"
         base = sym.split("/")[0]
 
-        if c.low - tol <= c.ema150 <= c.high + tol:
-            ema150.append(f"{base} ({trend})")
-            stats["ema150"] += 1
-
-        if c.low - tol <= c.ema200 <= c.high + tol:
-            ema200.append(f"{base} ({trend})")
-            stats["ema200"] += 1
-
-        if c.low - tol <= c.ema250 <= c.high + tol:
-            ema250.append(f"{base} ({trend})")
-            stats["ema250"] += 1
+        for span in spans:
+            touched[span].append(f"{base} ({trend})")
 
         if DEBUG:
-            log.info(f"{sym} PASS | {trend} | HTF {htf_bias}")
-
-        await asyncio.sleep(DELAY_PER_SYMBOL)
+            log.info(f"{sym} PASS | {trend}")
 
     return ema150, ema200, ema250
 
 # ================= COMMANDS =================
-async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if context.application.bot_data.get("scanning"):
-        await update.message.reply_text("⛔ Scan masih berjalan")
-        return
+INTRO = (
+    "🔍 *EMA TOUCH SCAN FINAL*\n"
+    "• TF Entry : 5m\n"
+    "• HTF Bias : 15m + 1h\n"
+    "• Trend Only (NO Countertrend)\n"
+    "• High Winrate Mode\n\n"
+)
 
-    context.application.bot_data["scanning"] = True
+async def run_scan(job):
+    # progress dipublish ke semua chat yang ikut job, return teks akhir
     await ensure_markets()
 
     stats = {
@@ -214,64 +181,76 @@ async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "bullish": 0,
         "bearish": 0,
         "filtered": 0,
+        "prefilter": 0,
     }
 
-    try:
-        await update.message.reply_text(
-            "🔍 *EMA TOUCH SCAN FINAL*\n"
-            "• TF Entry : 5m\n"
-            "• HTF Bias : 15m + 1h\n"
-            "• Trend Only (NO Countertrend)\n"
-            "• High Winrate Mode\n\n"
-            "⏳ Scanning...",
-            parse_mode="Markdown"
-        )
-
-        symbols = get_top_volume_symbols(TOP_N)
-        batches = [symbols[i:i+BATCH_SIZE] for i in range(0, TOP_N, BATCH_SIZE)]
-
-        ema150_all, ema200_all, ema250_all = [], [], []
-
-        for i, batch in enumerate(batches, 1):
-            e150, e200, e250 = await scan_batch(batch, i, stats)
-            ema150_all += e150
-            ema200_all += e200
-            ema250_all += e250
-            if i < TOTAL_BATCH:
-                await asyncio.sleep(DELAY_BETWEEN_BATCH)
-
-        msg = (
-            "🔍 *EMA TOUCH SCANNER – FINAL*\n\n"
-            "━━━━━━━━━━━━━━\n"
-            "📈 *EMA150*\n"
-            "━━━━━━━━━━━━━━\n"
-            + ("\n".join(sorted(set(ema150_all))) if ema150_all else "- None") +
-            "\n\n━━━━━━━━━━━━━━\n"
-            "📉 *EMA200*\n"
-            "━━━━━━━━━━━━━━\n"
-            + ("\n".join(sorted(set(ema200_all))) if ema200_all else "- None") +
-            "\n\n━━━━━━━━━━━━━━\n"
-            "🟣 *EMA250*\n"
-            "━━━━━━━━━━━━━━\n"
-            + ("\n".join(sorted(set(ema250_all))) if ema250_all else "- None") +
-            "\n\n━━━━━━━━━━━━━━\n"
-            "📊 *STAT*\n"
-            f"• Scanned  : {stats['scanned']}\n"
-            f"• Filtered : {stats['filtered']}\n"
-            f"• Bullish  : {stats['bullish']}\n"
-            f"• Bearish  : {stats['bearish']}\n"
-            f"\n🕒 {datetime.now(timezone.utc):%Y-%m-%d %H:%M UTC}"
-        )
-
-        await update.message.reply_text(msg, parse_mode="Markdown")
-
-    finally:
-        context.application.bot_data["scanning"] = False
+    symbols = await get_top_volume_symbols(TOP_N)
+    symbols, stats["prefilter"] = await prefilter.prune(symbols)
+    batches = [symbols[i:i+BATCH_SIZE] for i in range(0, len(symbols), BATCH_SIZE)]
+
+    ema150_all, ema200_all, ema250_all = [], [], []
+
+    for i, batch in enumerate(batches, 1):
+        e150, e200, e250 = await scan_batch(batch, i, stats)
+        ema150_all += e150
+        ema200_all += e200
+        ema250_all += e250
+        job.publish(INTRO + f"⏳ Batch {i}/{len(batches)} selesai")
+
+    return (
+        "🔍 *EMA TOUCH SCANNER – FINAL*\n\n"
+        "━━━━━━━━━━━━━━\n"
+        "📈 *EMA150*\n"
+        "━━━━━━━━━━━━━━\n"
+        + ("\n".join(sorted(set(ema150_all))) if ema150_all else "- None") +
+        "\n\n━━━━━━━━━━━━━━\n"
+        "📉 *EMA200*\n"
+        "━━━━━━━━━━━━━━\n"
+        + ("\n".join(sorted(set(ema200_all))) if ema200_all else "- None") +
+        "\n\n━━━━━━━━━━━━━━\n"
+        "🟣 *EMA250*\n"
+        "━━━━━━━━━━━━━━\n"
+        + ("\n".join(sorted(set(ema250_all))) if ema250_all else "- None") +
+        "\n\n━━━━━━━━━━━━━━\n"
+        "📊 *STAT*\n"
+        f"• Scanned  : {stats['scanned']}\n"
+        f"• Filtered : {stats['filtered']}\n"
+        f"• Bullish  : {stats['bullish']}\n"
+        f"• Bearish  : {stats['bearish']}\n"
+        f"• Prefilter: {stats['prefilter']} skip\n"
+        f"\n🕒 {datetime.now(timezone.utc):%Y-%m-%d %H:%M UTC}"
+    )
+
+async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # user lain yang /scan di candle yang sama ikut job yang sama
+    await scan_jobs.submit(
+        update, context, scan_jobs.key("signalmonitor", "", TF_LTF), run_scan,
+        INTRO + "⏳ Scanning...",
+        parse_mode="Markdown"
+    )
 
 # ================= INIT =================
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(metrics.summary(), parse_mode="Markdown")
+
+async def post_init(app):
+    if HTF_WARM:
+        app.create_task(htf_warm_loop(app))
+
+async def post_shutdown(app):
+    await candles.fetcher.close()
+
 def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     app.add_handler(CommandHandler("scan", scan))
+    app.add_handler(CommandHandler("cancel", cancel_scan))
+    app.add_handler(CommandHandler("stats", stats))
     log.info("EMA TOUCH SCANNER FINAL RUNNING")
     app.run_polling(stop_signals=None)
 
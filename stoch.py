@@ -1,10 +1,9 @@
-import ccxt
 import pandas as pd
 import time
 import os
+import sys
 import asyncio
 import logging
-import math
 
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
@@ -15,10 +14,10 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 TIMEFRAMES = ["5m", "15m", "1h", "1d"]
 FETCH_LIMIT = 50
 
+# TF yang dibangun dari candle 5m (cache), 1d tetap fetch native
+RESAMPLE_FROM = {"15m": "5m", "1h": "5m"}
+
 TOP_N = 400
-BATCH_COUNT = 6
-SLEEP_PER_SYMBOL = 0.12
-DELAY_BETWEEN_BATCH = 5  # seconds
 
 # Stochastic settings
 STO_K = 5
@@ -37,42 +36,43 @@ logging.basicConfig(
 log = logging.getLogger("STOCH-OB-OS-BOT")
 
 # ================= EXCHANGE =================
-exchange = ccxt.mexc({
-    "enableRateLimit": True,
-    "options": {"defaultType": "swap"}
-})
-
-MARKETS_LOADED = False
-
-# ================= INIT =================
-async def ensure_markets():
-    global MARKETS_LOADED
-    if not MARKETS_LOADED:
-        log.info("Loading markets...")
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, exchange.load_markets)
-        MARKETS_LOADED = True
-        log.info("Markets loaded")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot"))
+from fetcher import get_fetcher
+from exchange import ensure_markets
+from candles import get_candle_cache
+from tickers import get_ticker_snapshot
+from streaming import SCAN_WINDOW, WAVE_LINGER, cancel_scan, get_scan_jobs, iter_completed
+from strategies import StochDetector
+import kernels
+import metrics
+
+fetcher = get_fetcher()
+candles = get_candle_cache()
+tickers = get_ticker_snapshot()
+scan_jobs = get_scan_jobs()
+
+# logic OB / OS sama dengan /scan stoch di bot utama
+detector = StochDetector(
+    TIMEFRAMES, FETCH_LIMIT, STO_K, STO_D, STO_SMOOTH, OVERBOUGHT, OVERSOLD,
+    RESAMPLE_FROM, TOP_N
+)
 
 # ================= INDICATOR =================
 def calc_stochastic(df, k_period=5, d_period=3, smooth=3):
-    low_min = df["low"].rolling(k_period).min()
-    high_max = df["high"].rolling(k_period).max()
+    k_raw, k, d = kernels.stochastic(
+        df["high"].to_numpy(float)[None, :],
+        df["low"].to_numpy(float)[None, :],
+        df["close"].to_numpy(float)[None, :],
+        k_period, d_period, smooth
+    )
 
-    df["%K_raw"] = 100 * (df["close"] - low_min) / (high_max - low_min)
-    df["%K"] = df["%K_raw"].rolling(smooth).mean()
-    df["%D"] = df["%K"].rolling(d_period).mean()
+    df["%K_raw"] = k_raw[0]
+    df["%K"] = k[0]
+    df["%D"] = d[0]
 
     return df
 
-def stochastic_overbought(df):
-    if len(df) < 20:
-        return False
-
-    k2 = df["%K"].iloc[-2]  # last closed candle
-    d2 = df["%D"].iloc[-2]
-    k3 = df["%K"].iloc[-3]
-
+def is_overbought(k2, d2, k3):
     if pd.isna(k2) or pd.isna(d2) or pd.isna(k3):
         return False
 
@@ -82,14 +82,7 @@ def stochastic_overbought(df):
         k2 < k3  # momentum mulai melemah
     )
 
-def stochastic_oversold(df):
-    if len(df) < 20:
-        return False
-
-    k2 = df["%K"].iloc[-2]
-    d2 = df["%D"].iloc[-2]
-    k3 = df["%K"].iloc[-3]
-
+def is_oversold(k2, d2, k3):
     if pd.isna(k2) or pd.isna(d2) or pd.isna(k3):
         return False
 
@@ -99,93 +92,67 @@ def stochastic_oversold(df):
         k2 > k3  # momentum mulai menguat
     )
 
-# ================= FETCH =================
-def get_top_symbols(n):
-    log.info("Fetching tickers...")
-    tickers = exchange.fetch_tickers()
-    pairs = []
+def stochastic_overbought(df):
+    if len(df) < 20:
+        return False
+
+    # last closed candle
+    return is_overbought(df["%K"].iloc[-2], df["%D"].iloc[-2], df["%K"].iloc[-3])
+
+def stochastic_oversold(df):
+    if len(df) < 20:
+        return False
 
-    for s, t in tickers.items():
-        if s.endswith("/USDT:USDT") and t and t.get("quoteVolume"):
-            pairs.append((s, t["quoteVolume"]))
+    return is_oversold(df["%K"].iloc[-2], df["%D"].iloc[-2], df["%K"].iloc[-3])
 
-    pairs.sort(key=lambda x: x[1], reverse=True)
-    symbols = [s for s, _ in pairs[:n]]
+# ================= FETCH =================
+async def get_top_symbols(n):
+    log.info("Fetching tickers...")
+    await tickers.refresh()
+    symbols = tickers.top_volume(n)
 
     log.info(f"Selected TOP {len(symbols)} symbols")
     return symbols
 
-def fetch_df(symbol, tf):
-    ohlcv = exchange.fetch_ohlcv(symbol, tf, limit=FETCH_LIMIT)
-    return pd.DataFrame(
-        ohlcv,
-        columns=["time", "open", "high", "low", "close", "volume"]
-    )
+async def fetch_rows(sym, tf):
+    try:
+        return await candles.series(
+            sym, tf, FETCH_LIMIT, base=RESAMPLE_FROM.get(tf)
+        )
+    except Exception as e:
+        log.warning(f"Error {sym.split('/')[0]} {tf}: {e}")
+        return None
 
 # ================= SCANNER =================
-async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await ensure_markets()
-
-    start_time = time.time()
-
-    await update.message.reply_text(
-        "🔍 *STOCHASTIC SCANNER*\n"
-        "KDJ (5,3,3)\n"
-        "🔴 OB > 83 | 🟢 OS < 10\n\n"
-        "📦 TOP 400 coins · Multi TF\n"
-        "⏳ Please wait...",
-        parse_mode="Markdown"
-    )
-
-    symbols = get_top_symbols(TOP_N)
-    batch_size = math.ceil(len(symbols) / BATCH_COUNT)
-    batches = [
-        symbols[i:i + batch_size]
-        for i in range(0, len(symbols), batch_size)
-    ]
-
-    results = {
-        "overbought": {tf: [] for tf in TIMEFRAMES},
-        "oversold":   {tf: [] for tf in TIMEFRAMES}
-    }
-
-    for bi, batch in enumerate(batches, 1):
-        log.info(f"===== BATCH {bi}/{len(batches)} START =====")
-
-        for sym in batch:
+async def fetch_symbol(sym):
+    # TF native dulu, TF resample menyusul setelah candle base-nya
+    # masuk cache. pacing diatur budget weight di fetcher
+    native = [tf for tf in TIMEFRAMES if tf not in RESAMPLE_FROM]
+    derived = [tf for tf in TIMEFRAMES if tf in RESAMPLE_FROM]
+
+    rows = await asyncio.gather(*(fetch_rows(sym, tf) for tf in native))
+    rows += await asyncio.gather(*(fetch_rows(sym, tf) for tf in derived))
+    return sym, dict(zip(native + derived, rows))
+
+async def scan_signals(symbols):
+    # async generator: tiap gelombang symbol yang selesai di-fetch
+    # langsung dihitung, yield (jumlah symbol, [(side, tf, base), ...])
+    async for done in iter_completed((fetch_symbol(sym) for sym in symbols), WAVE_LINGER, SCAN_WINDOW):
+        # satu pass numpy per TF untuk semua symbol di gelombang ini
+        data = {tf: {sym: rows[tf] for sym, rows in done} for tf in TIMEFRAMES}
+        with metrics.timed("indicator", "stoch"):
+            signals = detector.signals(data, [sym for sym, _ in done])
+
+        hits = []
+        for tf, side, sym in signals:
             base = sym.split("/")[0]
+            hits.append((side, tf, base))
+            log.info(f"{'🔴 OB' if side == 'overbought' else '🟢 OS'} {base} @ {tf}")
 
-            for tf in TIMEFRAMES:
-                try:
-                    df = fetch_df(sym, tf)
-                    df = calc_stochastic(df, STO_K, STO_D, STO_SMOOTH)
-
-                    if stochastic_overbought(df):
-                        results["overbought"][tf].append(base)
-                        log.info(f"🔴 OB {base} @ {tf}")
-
-                    if stochastic_oversold(df):
-                        results["oversold"][tf].append(base)
-                        log.info(f"🟢 OS {base} @ {tf}")
-
-                except Exception as e:
-                    log.warning(f"Error {base} {tf}: {e}")
-
-            await asyncio.sleep(SLEEP_PER_SYMBOL)
-
-        await update.message.reply_text(f"✅ Batch {bi}/{len(batches)} selesai")
-
-        if bi < len(batches):
-            await asyncio.sleep(DELAY_BETWEEN_BATCH)
-
-    elapsed = int(time.time() - start_time)
-
-    # ================= OUTPUT =================
-    msg = "📊 *STOCHASTIC SCANNER RESULT*\n"
-    msg += "KDJ (5,3,3)\n\n"
-
-    found = False
+        yield len(done), hits
 
+def format_results(results):
+    msg = ""
     for tf in TIMEFRAMES:
         ob = results["overbought"][tf]
         os_ = results["oversold"][tf]
@@ -193,7 +160,6 @@ async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not ob and not os_:
             continue
 
-        found = True
         msg += f"⏱ *TF {tf}*\n"
 
         if ob:
@@ -205,26 +171,79 @@ async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
             msg += ", ".join(os_[:20]) + "\n"
 
         msg += "\n"
+    return msg
+
+HEADER = (
+    "🔍 *STOCHASTIC SCANNER*\n"
+    "KDJ (5,3,3)\n"
+    "🔴 OB > 83 | 🟢 OS < 10\n\n"
+)
+
+async def run_scan(job):
+    # hasil dipublish ke semua chat yang ikut job, return teks akhir
+    await ensure_markets()
+
+    start_time = time.time()
+
+    symbols = await get_top_symbols(TOP_N)
+
+    results = {
+        "overbought": {tf: [] for tf in TIMEFRAMES},
+        "oversold":   {tf: [] for tf in TIMEFRAMES}
+    }
+
+    # hit langsung masuk ke pesan live, tidak menunggu semua symbol
+    scanned = 0
+    async for n, hits in scan_signals(symbols):
+        scanned += n
+        for side, tf, base in hits:
+            results[side][tf].append(base)
+
+        job.publish(
+            HEADER + f"⏳ {scanned}/{len(symbols)} coins\n\n" + format_results(results)
+        )
+
+    elapsed = int(time.time() - start_time)
+
+    # ================= OUTPUT =================
+    found = format_results(results)
 
     if not found:
-        await update.message.reply_text("❌ Tidak ada signal OB / OS ditemukan")
-        return
+        return HEADER + "❌ Tidak ada signal OB / OS ditemukan"
 
+    msg = "📊 *STOCHASTIC SCANNER RESULT*\n"
+    msg += "KDJ (5,3,3)\n\n"
+    msg += found
     msg += (
         "Note:\n"
         "- Overbought → potensi pullback / rejection\n"
         "- Oversold → potensi pullback / bounce\n"
         f"⏱ Scan time: {elapsed//60}m {elapsed%60}s"
     )
+    return msg
 
-    await update.message.reply_text(msg, parse_mode="Markdown")
+async def scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # user lain yang /scan di candle yang sama ikut job yang sama
+    await scan_jobs.submit(
+        update, context, scan_jobs.key("stoch", "", TIMEFRAMES[0]), run_scan,
+        HEADER + "📦 TOP 400 coins · Multi TF\n⏳ Please wait...",
+        parse_mode="Markdown"
+    )
 
 # ================= MAIN =================
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(metrics.summary(), parse_mode="Markdown")
+
+async def post_shutdown(app):
+    await fetcher.close()
+
 def main():
     log.info("Starting STOCHASTIC OB / OS Scanner Bot...")
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = ApplicationBuilder().token(BOT_TOKEN).post_shutdown(post_shutdown).build()
     app.add_handler(CommandHandler("scan", scan))
-    log.info("Bot is running. Use /scan in Telegram")
+    app.add_handler(CommandHandler("cancel", cancel_scan))
+    app.add_handler(CommandHandler("stats", stats))
+    log.info("Bot is running. Use /scan or /cancel in Telegram")
     app.run_polling(stop_signals=None)
 
 if __name__ == "__main__":